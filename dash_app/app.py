@@ -18,6 +18,7 @@ app.layout = html.Div(
             html.A("Project GitHub", href="https://github.com/AntonioPelayo/my-run-forecast", target="_blank" , style={"marginRight": "1rem"}),
             html.A("Blog", href="/blog_home", style={"marginRight": "1rem"}),
             html.A("GPX Route Completion Time Predictor", href="/gpx_time_predictor", style={"marginRight": "1rem"}),
+            html.A("Distributions", href="/distributions", style={"marginRight": "1rem"}),
         ]),
         dash.page_container,
     ],
@@ -1,13 +1,12 @@
 from __future__ import annotations
 
 import base64
-import io
 
 import dash
 from dash import Input, Output, dcc, html
-from fitparse import FitFile
 
-from utils.fit import fit_to_df, standardize_fit_df
+from utils.config import M_TO_KM_MULTIPLIER
+from utils.fit import extract_fit_activity, standardize_fit_df
 from utils.plots import plot_run
 
 dash.register_page(__name__, path="/activity_analysis", name="Activity Analysis")
@@ -24,6 +23,16 @@ def _empty_figure():
     }
 
 
+def _activity_status(filename, activity) -> str:
+    status = f"Loaded {filename}: {activity.sport or 'unknown'}"
+    if activity.sub_sport:
+        status += f" ({activity.sub_sport})"
+    distance_m = activity.session.get("total_distance")
+    if distance_m is not None:
+        status += f", {distance_m * M_TO_KM_MULTIPLIER:.2f} km"
+    return status + "."
+
+
 layout = html.Div(
     [
         html.H2("Activity Analysis"),
@@ -70,8 +79,8 @@ def update_plot(contents, filename):
     try:
         _, content_string = contents.split(",", 1)
         data = base64.b64decode(content_string)
-        fit = FitFile(io.BytesIO(data))
-        df = fit_to_df(fit)
+        activity = extract_fit_activity(data)
+        df = activity.records
         if not df.empty:
             df = standardize_fit_df(df)
 
@@ -79,6 +88,6 @@ def update_plot(contents, filename):
             return _empty_figure(), "No GPS data found in this .fit file."
 
         fig = plot_run(df, title=f"Activity: {filename}")
-        return fig, f"Loaded {filename}."
+        return fig, _activity_status(filename, activity)
     except Exception as exc:
         return _empty_figure(), f"Failed to parse {filename}: {exc}"
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import dash
+from dash import Input, Output, dcc, html
+
+from utils import sketches
+from utils.config import PARQUET_RUN_ACTIVITIES_PATH
+
+dash.register_page(__name__, path="/distributions", name="Distributions")
+
+METRIC_LABELS = {
+    "heart_rate": "Heart rate",
+    "power": "Power",
+    "pace": "Pace",
+    "percent_grade": "Grade",
+}
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+
+def load_sketches() -> dict[str, sketches.MetricSketch]:
+    # Ingestion keeps the saved sketches current; the page only reads them
+    return sketches.load_sketches(sketches.sketches_path(PARQUET_RUN_ACTIVITIES_PATH)) or sketches.empty_sketches()
+
+
+def distribution_figure(sketch: sketches.MetricSketch, label: str) -> dict:
+    histogram = sketch.histogram()
+    return {
+        "data": [{
+            "type": "bar",
+            "x": list((histogram["left"] + histogram["right"]) / 2),
+            "y": list(histogram["seconds"] / 3600),
+            "width": sketch.spec.width,
+            "name": label,
+        }],
+        "layout": {
+            "xaxis": {"title": {"text": f"{label} ({sketch.spec.unit})"}},
+            "yaxis": {"title": {"text": "Hours"}},
+            "bargap": 0,
+            "margin": {"t": 30},
+        },
+    }
+
+
+def percentile_rows(sketch: sketches.MetricSketch) -> list[html.Tr]:
+    values = sketch.quantiles([p / 100 for p in PERCENTILES])
+    return [
+        html.Tr([html.Th(f"P{p}") for p in PERCENTILES]),
+        html.Tr([html.Td("-" if value != value else f"{value:.1f}") for value in values]),
+    ]
+
+
+layout = html.Div(
+    style={"maxWidth": "75%", "padding": "0 1.5rem"},
+    children=[
+        html.H2("Archive-wide Distributions"),
+        html.P(
+            "Time-weighted distribution of every recorded sample across all run activities. "
+            "Pace only counts moving samples."
+        ),
+        dcc.Dropdown(
+            id="distribution-metric",
+            options=[{"label": label, "value": name} for name, label in METRIC_LABELS.items()],
+            value="heart_rate",
+            clearable=False,
+            style={"maxWidth": "20rem", "marginBottom": "1rem"},
+        ),
+        html.Div(id="distribution-status"),
+        dcc.Graph(id="distribution-plot"),
+        html.Table(id="distribution-percentiles"),
+    ],
+)
+
+
+@dash.callback(
+    Output("distribution-plot", "figure"),
+    Output("distribution-percentiles", "children"),
+    Output("distribution-status", "children"),
+    Input("distribution-metric", "value"),
+)
+def update_distribution(metric):
+    sketch = load_sketches()[metric]
+    label = METRIC_LABELS[metric]
+    status = f"{sketch.total_seconds / 3600:.1f} hours of {label.lower()} data."
+    return distribution_figure(sketch, label), percentile_rows(sketch), status
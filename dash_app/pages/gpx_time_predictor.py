@@ -2,16 +2,11 @@ from __future__ import annotations
 
 from pathlib import Path
 import base64
-import os
-import tempfile
 
 import dash
 from dash import Input, Output, dcc, html
 
-from gpx_time_prediction_models.inference.predict import (
-    load_artifact,
-    predict_elapsed_seconds
-)
+from gpx_time_prediction_models.inference.predict import ArtifactCache
 from utils.config import M_TO_MI_MULTIPLIER, M_TO_FT_MULTIPLIER
 from utils.plots import plot_run
 from utils import gpx as gu
@@ -26,6 +21,8 @@ dash.register_page(
 LINEAR_MODEL_WEIGHTS = Path(
     "gpx_time_prediction_models/artifacts/linear_weights.json"
 )
+# Loaded once per worker; a retrained linear_weights.json is picked up without a restart
+LINEAR_MODEL = ArtifactCache(LINEAR_MODEL_WEIGHTS)
 
 def _empty_figure():
     return {
@@ -110,12 +107,13 @@ layout = html.Div(
             id="prediction-pace-output",
             style={"marginTop": "1rem", "fontWeight": "bold"}
         ),
+        html.Small(id="gpx-model-version", style={"color": "gray"}),
     ]
 )
 
 
 def generate_plot(gpx_file):
-    df = gu.gpx_to_df(gpx_file)
+    df = gu.analyze_route(gpx_file).points
 
     if df.empty or "position_lat" not in df.columns or "position_long" not in df.columns:
         return _empty_figure()
@@ -127,8 +125,7 @@ def generate_plot(gpx_file):
 
 def generate_prediction(gpx_file, is_trail=False):
     distance, cum_elevation_gain = gu.route_summary(gpx_file)
-    seconds = predict_elapsed_seconds(
-        load_artifact(LINEAR_MODEL_WEIGHTS),
+    seconds = LINEAR_MODEL.get().predict(
         distance,
         cum_elevation_gain,
         is_trail
@@ -136,6 +133,24 @@ def generate_prediction(gpx_file, is_trail=False):
     return seconds
 
 
+def generate_prediction_range(gpx_file, is_trail=False):
+    # P10/P90 seconds from the bootstrap ensemble, None for artifacts trained without one
+    model = LINEAR_MODEL.get()
+    if not model.has_intervals:
+        return None
+    distance, cum_elevation_gain = gu.route_summary(gpx_file)
+    low, _, high = model.predict_quantiles(distance, cum_elevation_gain, is_trail)
+    return low, high
+
+
+def _prediction_text(prediction_s, prediction_range) -> str:
+    text = f"Predicted time: {tu.hours_to_hhmmss(tu.seconds_to_hours(prediction_s))}"
+    if prediction_range is None:
+        return text
+    low, high = (tu.hours_to_hhmmss(tu.seconds_to_hours(s)) for s in prediction_range)
+    return f"{text} (80% range: {low} to {high})"
+
+
 def _route_summary_text(distance_m: float, gain_m: float, metric=True) -> str:
     if metric:
         return f"Distance: {distance_m/1000:.2f} km, Elevation Gain: {gain_m:.2f} m"
@@ -145,20 +160,19 @@ def _route_summary_text(distance_m: float, gain_m: float, metric=True) -> str:
         return f"Distance: {distance_mi:.2f} mi, Elevation Gain: {gain_ft:.2f} ft"
 
 
-def _predict_and_plot(gpx_path: str, is_trail=False):
-    fig = generate_plot(gpx_path)
-    prediction = generate_prediction(gpx_path, is_trail=is_trail)
-    distance, cum_elevation_gain = gu.route_summary(gpx_path)
-    return fig, prediction, distance, cum_elevation_gain
+def _predict_and_plot(gpx_source, is_trail=False):
+    # Parsed once per distinct file content; repeat views are served from the route cache
+    fig = generate_plot(gpx_source)
+    prediction = generate_prediction(gpx_source, is_trail=is_trail)
+    prediction_range = generate_prediction_range(gpx_source, is_trail=is_trail)
+    distance, cum_elevation_gain = gu.route_summary(gpx_source)
+    return fig, prediction, prediction_range, distance, cum_elevation_gain
 
 
 def _resolve_gpx_source(contents, filename, sample_path):
     if contents and filename and filename.lower().endswith(".gpx"):
         _, content_string = contents.split(",", 1)
-        data = base64.b64decode(content_string)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".gpx") as tmp:
-            tmp.write(data)
-            return tmp.name, f"Loaded {filename}."
+        return base64.b64decode(content_string), f"Loaded {filename}."
     if sample_path:
         return sample_path, f"Loaded sample: {Path(sample_path).name}."
     return None, "Waiting for a .gpx upload or sample selection."
@@ -170,6 +184,7 @@ def _resolve_gpx_source(contents, filename, sample_path):
     Output("gpx-route_metrics", "children"),
     Output("gpx-prediction-output", "children"),
     Output("prediction-pace-output", "children"),
+    Output("gpx-model-version", "children"),
     Input("gpx-sample-dropdown", "value"),
     Input("gpx-upload", "contents"),
     Input("gpx-upload", "filename"),
@@ -181,24 +196,22 @@ def update_page(sample_path, contents, filename, is_trail_value, is_metric_value
     prediction_output = "Prediction: N/A"
     pace_output = "Pace: N/A"
 
-    gpx_path, status = _resolve_gpx_source(contents, filename, sample_path)
-    if gpx_path is None:
-        return _empty_figure(), status, gpx_route_metrics, prediction_output, pace_output
+    gpx_source, status = _resolve_gpx_source(contents, filename, sample_path)
+    if gpx_source is None:
+        return _empty_figure(), status, gpx_route_metrics, prediction_output, pace_output, ""
 
     is_trail = "trail" in (is_trail_value or [])
     is_metric = "km_m" in (is_metric_value or [])
 
     try:
-        fig, prediction_s, distance, cum_elevation_gain = _predict_and_plot(gpx_path, is_trail)
+        fig, prediction_s, prediction_range, distance, cum_elevation_gain = _predict_and_plot(gpx_source, is_trail)
         return (
             fig,
             status,
             _route_summary_text(distance, cum_elevation_gain, is_metric),
-            f"Predicted time: {tu.hours_to_hhmmss(tu.seconds_to_hours(prediction_s))}",
-            f"Predicted pace: {tu.format_seconds_to_pace(distance, prediction_s, metric=is_metric)}"
+            _prediction_text(prediction_s, prediction_range),
+            f"Predicted pace: {tu.format_seconds_to_pace(distance, prediction_s, metric=is_metric)}",
+            f"Model: {LINEAR_MODEL.model_version}",
         )
     except Exception as exc:
-        return _empty_figure(), f"Failed to parse: {exc}", "", "", ""
-    finally:
-        if contents and gpx_path and os.path.exists(gpx_path):
-            os.remove(gpx_path)
+        return _empty_figure(), f"Failed to parse: {exc}", "", "", "", ""
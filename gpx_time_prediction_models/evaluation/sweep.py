@@ -0,0 +1,252 @@
+"""Cross-validation and hyperparameter sweeps for the route time models.
+
+Every candidate (a linear feature set or a TimeMLP training config) is fit
+and scored on each fold of a shuffled k-fold split and of a time-ordered
+backtest, where each fold trains on all runs before a cutoff and tests on
+the next block. The (candidate, fold) fits are independent, so they are fanned
+out across a process pool. Each fit gets a seed derived from the base seed,
+the candidate and the fold, so results do not depend on the worker count.
+
+Run with:
+    python -m gpx_time_prediction_models.evaluation.sweep [--workers N] [--output results.parquet]
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from gpx_time_prediction_models.inference.predict import CompiledLinearModel
+from gpx_time_prediction_models.training.features import FEATURE_NAMES, TARGET_NAME, build_training_matrix, training_frame
+from gpx_time_prediction_models.training import train_linear
+from models import time_torch
+from utils.config import DATA_PATH, PARQUET_RUN_ACTIVITIES_PATH
+from utils.storage import atomic_write_parquet
+from utils.summary_store import SUMMARY_STORE_FILE_NAME, update_summary_store
+
+LINEAR = "linear"
+MLP = "mlp"
+KFOLD = "kfold"
+BACKTEST = "backtest"
+
+# What a GPX file tells us about a route, so every candidate can serve predictions
+ROUTE_FEATURES: tuple[str, ...] = ("distance", "cum_elevation_gain", "is_trail")
+
+DEFAULT_LINEAR_FEATURE_SETS: tuple[tuple[str, ...], ...] = (
+    FEATURE_NAMES,
+    (*FEATURE_NAMES, "is_trail"),
+    ("road_distance", "trail_distance"),
+)
+DEFAULT_MLP_GRID: dict[str, list] = {
+    "hidden_sizes": [(32,), (64, 32)],
+    "lr": [1e-3, 5e-3],
+    "weight_decay": [1e-4, 1e-3],
+}
+SWEEP_FILE_NAME = "model_sweep.parquet"
+
+
+@dataclass(frozen=True)
+class Candidate:
+    model: str  # LINEAR or MLP
+    params: dict = field(default_factory=dict)  # Linear: feature_names; MLP: TrainingConfig overrides
+
+    @property
+    def name(self) -> str:
+        if self.model == LINEAR:
+            return f"{LINEAR}[{','.join(self.params['feature_names'])}]"
+        return f"{MLP}[{','.join(f'{key}={value}' for key, value in sorted(self.params.items()))}]"
+
+
+def linear_candidates(feature_sets: Iterable[Sequence[str]] = DEFAULT_LINEAR_FEATURE_SETS) -> list[Candidate]:
+    return [Candidate(LINEAR, {"feature_names": tuple(names)}) for names in feature_sets]
+
+
+def mlp_candidates(grid: dict[str, list] = DEFAULT_MLP_GRID) -> list[Candidate]:
+    """One candidate per point of the grid's cartesian product of TrainingConfig overrides."""
+    keys = sorted(grid)
+    return [Candidate(MLP, dict(zip(keys, values))) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def evaluation_frame(summaries: pd.DataFrame) -> pd.DataFrame:
+    """Usable training rows with route features, both targets, sub_sport and the activity date."""
+    frame = training_frame(summaries)
+    # Kept so each fold's training rows go through build_training_matrix like a real training run
+    frame["sub_sport"] = summaries.loc[frame.index, "sub_sport"]
+    frame["distance"] = frame["road_distance"] + frame["trail_distance"]
+    frame["cum_elevation_gain"] = frame["road_cum_elevation_gain"] + frame["trail_cum_elevation_gain"]
+    frame["elapsed_time_hours"] = frame[TARGET_NAME] / 3600
+    if "activity_date" in summaries:
+        frame["activity_date"] = pd.to_datetime(summaries.loc[frame.index, "activity_date"])
+    return frame.reset_index(drop=True)
+
+
+def kfold_splits(n_rows: int, n_folds: int, seed: int) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Shuffled k-fold (train, test) index pairs."""
+    if not 2 <= n_folds <= n_rows:
+        raise ValueError(f"Need 2 <= folds <= rows, got {n_folds} folds for {n_rows} rows")
+    order = np.random.default_rng(seed).permutation(n_rows)
+    folds = np.array_split(order, n_folds)
+    return [
+        (np.concatenate(folds[:i] + folds[i + 1:]), test)
+        for i, test in enumerate(folds)
+    ]
+
+
+def backtest_splits(dates: pd.Series, n_splits: int) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Expanding-window splits: runs sorted by date in n_splits + 1 blocks, fold i tests block i + 1."""
+    order = np.argsort(dates.to_numpy(), kind="stable")
+    blocks = np.array_split(order, n_splits + 1)
+    if any(len(block) == 0 for block in blocks):
+        raise ValueError(f"Too few rows ({len(order)}) for {n_splits} backtest splits")
+    return [(np.concatenate(blocks[:i + 1]), blocks[i + 1]) for i in range(n_splits)]
+
+
+def _fit_linear(train: pd.DataFrame, feature_names: tuple[str, ...]) -> CompiledLinearModel:
+    # Same matrix and artifact as train_linear ships, so the sweep scores the served model
+    artifact = train_linear.train(build_training_matrix(train, feature_names), "sweep")
+    return CompiledLinearModel.from_artifact(artifact)
+
+
+def _fit_predict(candidate: Candidate, train: pd.DataFrame, test: pd.DataFrame, seed: int) -> tuple[np.ndarray, float, float]:
+    # Returns predicted seconds, fit seconds and predict seconds; prediction goes through the serving model
+    start = time.perf_counter()
+    if candidate.model == LINEAR:
+        model = _fit_linear(train, candidate.params["feature_names"])
+        fit_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        predicted = model.predict_many(test)
+    else:
+        config = replace(time_torch.FAST_TRAINING_CONFIG, num_threads=1, seed=seed, **candidate.params)
+        torch_model, stats, _, _ = time_torch.train_time_mlp_fast(train, ROUTE_FEATURES, config)
+        model = time_torch.to_numpy(torch_model, stats)
+        fit_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        predicted = model.predict_many(test[list(ROUTE_FEATURES)].to_numpy()) * 3600
+    return np.asarray(predicted, dtype=float), fit_seconds, time.perf_counter() - start
+
+
+_FRAME: pd.DataFrame | None = None
+
+
+def _init_worker(frame: pd.DataFrame) -> None:
+    # Ship the data once per worker rather than once per task
+    global _FRAME
+    _FRAME = frame
+
+
+def _run_task(task: tuple[int, Candidate, str, int, np.ndarray, np.ndarray, int]) -> dict:
+    candidate_id, candidate, scheme, fold, train_idx, test_idx, seed = task
+    train, test = _FRAME.iloc[train_idx], _FRAME.iloc[test_idx]
+    predicted, fit_seconds, predict_seconds = _fit_predict(candidate, train, test, seed)
+    actual = test[TARGET_NAME].to_numpy(dtype=float)
+    errors = np.abs(predicted - actual)
+    return {
+        "candidate_id": candidate_id,
+        "candidate": candidate.name,
+        "model": candidate.model,
+        "params": json.dumps(candidate.params, default=list, sort_keys=True),
+        "scheme": scheme,
+        "fold": fold,
+        "seed": seed,
+        "n_train": len(train),
+        "n_test": len(test),
+        "mae_seconds": float(errors.mean()),
+        "mape": float(np.mean(errors[actual > 0] / actual[actual > 0]) * 100),
+        "fit_seconds": fit_seconds,
+        "latency_us_per_row": predict_seconds / len(test) * 1e6,
+    }
+
+
+def _task_seed(base_seed: int, candidate_id: int, scheme: str, fold: int) -> int:
+    return int(np.random.SeedSequence([base_seed, candidate_id, [KFOLD, BACKTEST].index(scheme), fold]).generate_state(1)[0])
+
+
+def run_sweep(
+    summaries: pd.DataFrame,
+    candidates: Sequence[Candidate],
+    n_folds: int = 5,
+    n_backtest_splits: int = 4,
+    seed: int = 0,
+    workers: int = 1,
+) -> pd.DataFrame:
+    """Score every candidate on every fold; one results row per (candidate, scheme, fold)."""
+    frame = evaluation_frame(summaries)
+    splits = {KFOLD: kfold_splits(len(frame), n_folds, seed)} if n_folds else {}
+    if n_backtest_splits:
+        if "activity_date" not in frame:
+            raise ValueError("Backtests need an activity_date column")
+        splits[BACKTEST] = backtest_splits(frame["activity_date"], n_backtest_splits)
+
+    tasks = [
+        (candidate_id, candidate, scheme, fold, train_idx, test_idx, _task_seed(seed, candidate_id, scheme, fold))
+        for candidate_id, candidate in enumerate(candidates)
+        for scheme, scheme_splits in splits.items()
+        for fold, (train_idx, test_idx) in enumerate(scheme_splits)
+    ]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(frame,)) as executor:
+            results = list(executor.map(_run_task, tasks))
+    else:
+        _init_worker(frame)
+        results = [_run_task(task) for task in tasks]
+    return pd.DataFrame.from_records(results)
+
+
+def summarize_sweep(results: pd.DataFrame) -> pd.DataFrame:
+    """Mean fold metrics per candidate and scheme, best MAE first."""
+    return (
+        results.groupby(["scheme", "candidate"], sort=False)
+        .agg(
+            mae_seconds=("mae_seconds", "mean"),
+            mae_std=("mae_seconds", "std"),
+            mape=("mape", "mean"),
+            fit_seconds=("fit_seconds", "mean"),
+            latency_us_per_row=("latency_us_per_row", "mean"),
+            folds=("fold", "count"),
+        )
+        .reset_index()
+        .sort_values(["scheme", "mae_seconds"])
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Cross-validate the linear and TimeMLP route models.")
+    parser.add_argument("--datadir", type=Path, default=PARQUET_RUN_ACTIVITIES_PATH, help="Activity parquet directory")
+    parser.add_argument("--output", type=Path, default=DATA_PATH / SWEEP_FILE_NAME, help="Per-fold results parquet")
+    parser.add_argument("--folds", type=int, default=5, help="k for shuffled k-fold, 0 to skip")
+    parser.add_argument("--backtest-splits", type=int, default=4, help="Time-ordered backtest folds, 0 to skip")
+    parser.add_argument("--seed", type=int, default=0, help="Base seed for splits and model init")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parallel fit processes")
+    parser.add_argument("--linear-only", action="store_true", help="Skip the TimeMLP grid")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    if args.workers < 1:
+        raise ValueError(f"--workers must be at least 1, got {args.workers}")
+
+    summaries = update_summary_store(args.datadir, DATA_PATH / SUMMARY_STORE_FILE_NAME).summaries
+    candidates = linear_candidates() + ([] if args.linear_only else mlp_candidates())
+    start = time.perf_counter()
+    results = run_sweep(summaries, candidates, args.folds, args.backtest_splits, args.seed, args.workers)
+    print(f"Scored {len(candidates)} candidates over {len(results)} folds in {time.perf_counter() - start:.1f}s")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_parquet(results, args.output)
+    with pd.option_context("display.width", 200, "display.max_colwidth", 80):
+        print(summarize_sweep(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
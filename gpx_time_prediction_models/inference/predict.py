@@ -1,18 +1,31 @@
 from __future__ import annotations
 
 import json
+import sys
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
 
 import numpy as np
+import pandas as pd
 
-from gpx_time_prediction_models.training.features import build_inference_vector
+from gpx_time_prediction_models.training.features import build_inference_matrix
 from utils import gpx as gu
+from utils.storage import content_hash, file_stat
 from utils import time as tu
 
+# P10/P50/P90 of the bootstrap ensemble
+DEFAULT_QUANTILES = (0.1, 0.5, 0.9)
+
+
 def load_artifact(path: Path) -> dict:
     with path.open("r", encoding="utf-8") as f:
         artifact = json.load(f)
+    return _validate_artifact(artifact)
 
+
+def _validate_artifact(artifact: dict) -> dict:
     required = (
         "intercept", "coefficients", "feature_names", "model_version",
         "feature_means", "feature_stds", "target_name"
@@ -24,37 +37,182 @@ def load_artifact(path: Path) -> dict:
     return artifact
 
 
+@dataclass(frozen=True)
+class CompiledLinearModel:
+    """Linear artifact with feature normalization folded into the coefficients.
+
+    intercept + weights @ x on raw features equals the artifact's
+    intercept + coefficients @ ((x - means) / stds).
+    """
+
+    model_version: str
+    feature_names: tuple[str, ...]
+    intercept: float
+    weights: np.ndarray
+    # Bootstrap refits, folded the same way, one row of weights per ensemble member
+    ensemble_intercepts: np.ndarray | None = None
+    ensemble_weights: np.ndarray | None = None
+
+    @property
+    def has_intervals(self) -> bool:
+        return self.ensemble_weights is not None
+
+    @classmethod
+    def from_artifact(cls, artifact: dict) -> "CompiledLinearModel":
+        coefficients = np.array(artifact["coefficients"], dtype=float)
+        means = np.array(artifact["feature_means"], dtype=float)
+        stds = np.array(artifact["feature_stds"], dtype=float)
+        feature_names = tuple(artifact["feature_names"])
+        if not len(coefficients) == len(means) == len(stds) == len(feature_names):
+            raise ValueError(
+                f"Coefficient length {len(coefficients)} != feature length {len(feature_names)}"
+            )
+        weights = coefficients / stds
+        weights.setflags(write=False)
+        ensemble_intercepts = ensemble_weights = None
+        if "bootstrap_coefficients" in artifact:
+            ensemble_weights = np.array(artifact["bootstrap_coefficients"], dtype=float) / stds
+            if ensemble_weights.ndim != 2 or ensemble_weights.shape[1] != len(feature_names):
+                raise ValueError(f"Bootstrap coefficients of shape {ensemble_weights.shape} do not match the features")
+            ensemble_intercepts = np.array(artifact["bootstrap_intercepts"], dtype=float) - ensemble_weights @ means
+            ensemble_weights.setflags(write=False)
+            ensemble_intercepts.setflags(write=False)
+        return cls(
+            model_version=str(artifact["model_version"]),
+            feature_names=feature_names,
+            intercept=float(artifact["intercept"]) - float(weights @ means),
+            weights=weights,
+            ensemble_intercepts=ensemble_intercepts,
+            ensemble_weights=ensemble_weights,
+        )
+
+    def _features(self, distance, cum_elevation_gain, is_trail) -> tuple[np.ndarray, tuple[int, ...]]:
+        if isinstance(distance, pd.DataFrame):
+            frame = distance
+            distance = frame["distance"].to_numpy(dtype=float)
+            cum_elevation_gain = frame["cum_elevation_gain"].to_numpy(dtype=float)
+            is_trail = frame["is_trail"].to_numpy(dtype=bool) if "is_trail" in frame else False
+        shape = np.broadcast(np.asarray(distance), np.asarray(cum_elevation_gain), np.asarray(is_trail)).shape
+        return build_inference_matrix(distance, cum_elevation_gain, is_trail, self.feature_names), shape
+
+    def predict_many(
+        self,
+        distance: np.ndarray | pd.DataFrame,
+        cum_elevation_gain: np.ndarray | None = None,
+        is_trail: np.ndarray | bool = False,
+    ) -> np.ndarray:
+        """Predict elapsed seconds for many routes in one matrix multiply.
+
+        Takes arrays, broadcast against each other (so a what-if grid keeps
+        its shape), or a DataFrame with `distance`, `cum_elevation_gain` and
+        optional `is_trail` columns.
+        """
+        X, shape = self._features(distance, cum_elevation_gain, is_trail)
+        return np.maximum(0.0, X @ self.weights + self.intercept).reshape(shape)
+
+    def predict(self, distance: float, cum_elevation_gain: float, is_trail: bool) -> float:
+        return float(self.predict_many(distance, cum_elevation_gain, is_trail))
+
+    def predict_quantiles(
+        self,
+        distance: np.ndarray | pd.DataFrame,
+        cum_elevation_gain: np.ndarray | None = None,
+        is_trail: np.ndarray | bool = False,
+        quantiles: tuple[float, ...] = DEFAULT_QUANTILES,
+    ) -> np.ndarray:
+        """Elapsed-second quantiles over the bootstrap ensemble, shape (*routes, len(quantiles)).
+
+        Inputs are as for `predict_many`; every route is scored by every
+        ensemble member in one matrix product.
+        """
+        if not self.has_intervals:
+            raise ValueError(f"Model {self.model_version} has no bootstrap ensemble, retrain to get intervals")
+        X, shape = self._features(distance, cum_elevation_gain, is_trail)
+        members = np.maximum(0.0, X @ self.ensemble_weights.T + self.ensemble_intercepts)
+        return np.quantile(members, quantiles, axis=1).T.reshape(*shape, len(quantiles))
+
+
+def compile_artifact(artifact: dict | CompiledLinearModel) -> CompiledLinearModel:
+    if isinstance(artifact, CompiledLinearModel):
+        return artifact
+    return CompiledLinearModel.from_artifact(artifact)
+
+
+def load_model(path: Path) -> CompiledLinearModel:
+    return CompiledLinearModel.from_artifact(load_artifact(path))
+
+
+class ArtifactCache:
+    """Process-level cache of a compiled artifact that picks up retrained weights.
+
+    The file is stat'ed at most every `check_interval` seconds. When its
+    size or mtime changed and its content hash differs, the new artifact is
+    loaded and swapped in as one reference assignment, so concurrent
+    requests see either the old or the new model, never a mix. A file that
+    fails to load (e.g. caught mid-write by a non-atomic writer) keeps the
+    previous model serving.
+    """
+
+    def __init__(self, path: Path, check_interval: float = 5.0) -> None:
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self.loaded_at: float | None = None
+        self._model: CompiledLinearModel | None = None
+        self._stat: tuple[int, int] | None = None
+        self._sha256: str | None = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def model_version(self) -> str | None:
+        return self._model.model_version if self._model is not None else None
+
+    def get(self) -> CompiledLinearModel:
+        now = time.monotonic()
+        if self._model is None or now >= self._next_check:
+            with self._lock:
+                if self._model is None or now >= self._next_check:
+                    self._refresh()
+                    self._next_check = now + self.check_interval
+        return self._model
+
+    def _refresh(self) -> None:
+        try:
+            stat = file_stat(self.path)
+            if stat == self._stat:
+                return
+            data = self.path.read_bytes()
+            sha256 = content_hash(data)
+            if sha256 != self._sha256:
+                model = CompiledLinearModel.from_artifact(_validate_artifact(json.loads(data)))
+                self._model, self._sha256 = model, sha256
+                self.loaded_at = time.time()
+            self._stat = stat
+        except (OSError, ValueError, KeyError) as exc:
+            if self._model is None:
+                raise
+            sys.stderr.write(f"[warn] Keeping model {self.model_version}, reload of {self.path} failed: {exc}\n")
+
+
 def predict_elapsed_seconds(
-    artifact: dict,
+    artifact: dict | CompiledLinearModel,
     distance: float,
     cum_elevation_gain: float,
     is_trail: bool,
 ) -> float:
-    features = build_inference_vector(
-        road_distance=0 if is_trail else distance,
-        road_cum_elevation_gain=0 if is_trail else cum_elevation_gain,
-        trail_distance=distance if is_trail else 0,
-        trail_cum_elevation_gain=cum_elevation_gain if is_trail else 0,
-        is_trail=is_trail
-    )
+    return compile_artifact(artifact).predict(distance, cum_elevation_gain, is_trail)
 
-    feature_names = artifact["feature_names"]
-    vector = np.array([features[name] for name in feature_names], dtype=float)
 
-    means = np.array(artifact["feature_means"], dtype=float)
-    stds = np.array(artifact["feature_stds"], dtype=float)
-    vector = (vector - means) / stds
-
-    intercept = float(artifact["intercept"])
-    coefficients = np.array(artifact["coefficients"], dtype=float)
-
-    if len(coefficients) != len(vector):
-        raise ValueError(
-            f"Coefficient length {len(coefficients)} != feature length {len(vector)}"
-        )
-
-    pred = intercept + float(vector @ coefficients)
-    return max(0.0, pred)
+def predict_elapsed_quantiles(
+    artifact: dict | CompiledLinearModel,
+    distance: float,
+    cum_elevation_gain: float,
+    is_trail: bool,
+    quantiles: tuple[float, ...] = DEFAULT_QUANTILES,
+) -> dict[str, float]:
+    """Elapsed-second quantiles keyed like {"p10": ..., "p50": ..., "p90": ...}."""
+    values = compile_artifact(artifact).predict_quantiles(distance, cum_elevation_gain, is_trail, quantiles)
+    return {f"p{round(q * 100)}": float(value) for q, value in zip(quantiles, values)}
 
 
 def main() -> None:
@@ -39,7 +39,8 @@ def _sub_sport_to_is_trail(series: pd.Series) -> pd.Series:
     return series.astype(str).str.strip().str.lower().eq("trail").astype(float)
 
 
-def build_training_matrix(df: pd.DataFrame) -> FeatureMatrix:
+def training_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Feature and target columns of every usable row, keeping the input index."""
     _validate_columns(df)
 
     frame = df[[
@@ -48,12 +49,17 @@ def build_training_matrix(df: pd.DataFrame) -> FeatureMatrix:
         "sub_sport", TARGET_NAME
     ]].copy()
     frame["is_trail"] = _sub_sport_to_is_trail(frame["sub_sport"])
-    frame = frame.drop(columns=["sub_sport"]).dropna()
+    return frame.drop(columns=["sub_sport"]).dropna()
+
+
+def build_training_matrix(df: pd.DataFrame, feature_names: tuple[str, ...] = FEATURE_NAMES) -> FeatureMatrix:
+    """Standardized `feature_names` columns and the target of every usable row."""
+    frame = training_frame(df)
 
     if frame.empty:
         raise ValueError("No valid rows after preprocessing")
 
-    X_raw = frame[list(FEATURE_NAMES)].to_numpy(dtype=float)
+    X_raw = frame[list(feature_names)].to_numpy(dtype=float)
     y = frame[TARGET_NAME].to_numpy(dtype=float)
 
     feature_means = X_raw.mean(axis=0)
@@ -65,7 +71,7 @@ def build_training_matrix(df: pd.DataFrame) -> FeatureMatrix:
     return FeatureMatrix(
         X=X,
         y=y,
-        feature_names=FEATURE_NAMES,
+        feature_names=tuple(feature_names),
         feature_means=feature_means,
         feature_stds=feature_stds,
     )
@@ -85,3 +91,27 @@ def build_inference_vector(
         "trail_cum_elevation_gain": float(trail_cum_elevation_gain),
         "is_trail": 1.0 if is_trail else 0.0,
     }
+
+
+def build_inference_matrix(
+    distance: np.ndarray,
+    cum_elevation_gain: np.ndarray,
+    is_trail: np.ndarray,
+    feature_names: tuple[str, ...] = FEATURE_NAMES,
+) -> np.ndarray:
+    """Vectorized `build_inference_vector`: one row per route, columns in `feature_names` order."""
+    distance = np.asarray(distance, dtype=float)
+    cum_elevation_gain = np.asarray(cum_elevation_gain, dtype=float)
+    trail = np.asarray(is_trail, dtype=bool).astype(float)
+    distance, cum_elevation_gain, trail = np.broadcast_arrays(distance, cum_elevation_gain, trail)
+    columns = {
+        "road_distance": distance * (1 - trail),
+        "road_cum_elevation_gain": cum_elevation_gain * (1 - trail),
+        "trail_distance": distance * trail,
+        "trail_cum_elevation_gain": cum_elevation_gain * trail,
+        "is_trail": trail,
+    }
+    unknown = [name for name in feature_names if name not in columns]
+    if unknown:
+        raise ValueError(f"Unknown inference features: {unknown}")
+    return np.column_stack([columns[name].ravel() for name in feature_names])
@@ -0,0 +1,190 @@
+"""Running sufficient statistics for the linear route model.
+
+The least-squares fit in `train_linear` only depends on the row count, the
+feature and target sums, XᵀX and Xᵀy of the raw features. Keeping those
+sums lets new or deleted activities be folded in with work proportional to
+the number of changed rows, and the model re-solved in closed form without
+re-reading the history. No per-activity rows are kept: a deleted or
+re-summarized activity is subtracted using the row the summary store held
+before the refresh (`SummaryDelta.previous`).
+
+Sums are held as exact fractions (every float is one), so adding and later
+removing a row leaves no rounding residue: a feature that becomes constant
+after deletions has a variance of exactly zero, as in the batch path.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import dataclass
+from fractions import Fraction
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from gpx_time_prediction_models.training.features import FEATURE_NAMES, TARGET_NAME, training_frame
+from utils.activity_cache import REMOVED, CacheRefresh
+from utils.storage import atomic_write_json
+
+STATS_FORMAT_VERSION = 2  # 1 also kept every activity's row
+
+
+def _exact(values) -> np.ndarray:
+    return np.vectorize(Fraction, otypes=[object])(np.asarray(values, dtype=float))
+
+
+def _parse(values) -> np.ndarray:
+    return np.vectorize(Fraction, otypes=[object])(np.asarray(values, dtype=str))
+
+
+@dataclass
+class LinearSufficientStats:
+    feature_names: tuple[str, ...]
+    count: int
+    feature_sums: np.ndarray  # Σx as Fractions, shape (p,)
+    target_sum: Fraction  # Σy
+    xtx: np.ndarray  # XᵀX of the raw features as Fractions, shape (p, p)
+    xty: np.ndarray  # Xᵀy as Fractions, shape (p,)
+
+    @classmethod
+    def empty(cls, feature_names: tuple[str, ...] = FEATURE_NAMES) -> "LinearSufficientStats":
+        p = len(feature_names)
+        return cls(
+            feature_names=tuple(feature_names),
+            count=0,
+            feature_sums=_exact(np.zeros(p)),
+            target_sum=Fraction(0),
+            xtx=_exact(np.zeros((p, p))),
+            xty=_exact(np.zeros(p)),
+        )
+
+    @classmethod
+    def from_summaries(cls, summaries: pd.DataFrame, feature_names: tuple[str, ...] = FEATURE_NAMES) -> "LinearSufficientStats":
+        stats = cls.empty(feature_names)
+        stats.add(summaries)
+        return stats
+
+    def _accumulate(self, X: np.ndarray, y: np.ndarray, sign: int) -> None:
+        if not len(X):
+            return
+        X, y = _exact(X), _exact(y)
+        self.count += sign * len(X)
+        self.feature_sums += sign * X.sum(axis=0)
+        self.target_sum += sign * y.sum()
+        self.xtx += sign * (X.T @ X)
+        self.xty += sign * (X.T @ y)
+
+    def _rows(self, summaries: pd.DataFrame) -> np.ndarray:
+        # Raw features followed by the target for every usable row
+        if summaries.empty:
+            return np.empty((0, len(self.feature_names) + 1))
+        return training_frame(summaries)[[*self.feature_names, TARGET_NAME]].to_numpy(dtype=float)
+
+    def add(self, summaries: pd.DataFrame) -> int:
+        """Fold in activity summaries. Returns the number of usable rows added."""
+        rows = self._rows(summaries)
+        self._accumulate(rows[:, :-1], rows[:, -1], 1)
+        return len(rows)
+
+    def remove(self, summaries: pd.DataFrame) -> int:
+        """Subtract summaries that were added before. Returns the number of usable rows removed."""
+        rows = self._rows(summaries)
+        self._accumulate(rows[:, :-1], rows[:, -1], -1)
+        return len(rows)
+
+    def apply(self, refresh: CacheRefresh) -> tuple[int, int]:
+        """Fold in one summary store refresh: subtract what changed rows held before, add what they hold now.
+
+        Returns the number of rows added (new or changed) and removed.
+        """
+        removed = self.remove(refresh.previous)
+        changes = refresh.changes
+        added = self.add(changes[changes['change'] != REMOVED]) if not changes.empty else 0
+        return added, removed
+
+    def matches(self, summaries: pd.DataFrame) -> bool:
+        """Cheap check that the stats describe `summaries`: same row count and target sum.
+
+        Fails when a refresh was not applied, e.g. after an interrupted run.
+        """
+        target = self._rows(summaries)[:, -1]
+        return len(target) == self.count and math.fsum(target) == float(self.target_sum)
+
+    def _centered(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Exact means, XᵀX and Xᵀy about the means
+        means = self.feature_sums / self.count
+        centered_xtx = self.xtx - self.count * np.outer(means, means)
+        centered_xty = self.xty - means * self.target_sum
+        return means, centered_xtx, centered_xty
+
+    def feature_means(self) -> np.ndarray:
+        return (self.feature_sums / self.count).astype(float)
+
+    def feature_stds(self) -> np.ndarray:
+        # Population std, as np.std in build_training_matrix
+        _, centered_xtx, _ = self._centered()
+        stds = np.sqrt(np.diag(centered_xtx / self.count).astype(float))
+        stds[stds == 0] = 1.0
+        return stds
+
+    def solve(self) -> tuple[float, np.ndarray]:
+        """Intercept and standardized-feature weights, as `fit_linear_regression` on the batch matrix."""
+        if self.count == 0:
+            raise ValueError("No valid rows after preprocessing")
+        _, centered_xtx, centered_xty = self._centered()
+        stds = self.feature_stds()
+        # Normal equations of [1, Z] with Z the standardized features; Z sums to zero
+        p = len(self.feature_names)
+        gram = np.zeros((p + 1, p + 1))
+        gram[0, 0] = self.count
+        gram[1:, 1:] = centered_xtx.astype(float) / np.outer(stds, stds)
+        rhs = np.concatenate(([float(self.target_sum)], centered_xty.astype(float) / stds))
+        # lstsq returns the minimum-norm solution, as the batch fit does for constant features
+        coeffs, *_ = np.linalg.lstsq(gram, rhs, rcond=None)
+        return float(coeffs[0]), coeffs[1:].astype(float, copy=False)
+
+    def to_dict(self) -> dict:
+        return {
+            "format_version": STATS_FORMAT_VERSION,
+            "feature_names": list(self.feature_names),
+            "count": self.count,
+            # Fractions as "numerator/denominator" strings so the sums stay exact
+            "feature_sums": self.feature_sums.astype(str).tolist(),
+            "target_sum": str(self.target_sum),
+            "xtx": self.xtx.astype(str).tolist(),
+            "xty": self.xty.astype(str).tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "LinearSufficientStats":
+        if payload.get("format_version") != STATS_FORMAT_VERSION:
+            raise ValueError(f"Unsupported stats format {payload.get('format_version')!r}")
+        return cls(
+            feature_names=tuple(payload["feature_names"]),
+            count=int(payload["count"]),
+            feature_sums=_parse(payload["feature_sums"]),
+            target_sum=Fraction(payload["target_sum"]),
+            xtx=_parse(payload["xtx"]),
+            xty=_parse(payload["xty"]),
+        )
+
+
+def load_stats(path: Path, feature_names: tuple[str, ...] = FEATURE_NAMES) -> LinearSufficientStats:
+    """Load saved stats, or empty stats when the file is missing, in an older format or built for other features."""
+    path = Path(path)
+    if not path.exists():
+        return LinearSufficientStats.empty(feature_names)
+    payload = json.loads(path.read_text())
+    if payload.get("format_version") != STATS_FORMAT_VERSION:
+        return LinearSufficientStats.empty(feature_names)
+    stats = LinearSufficientStats.from_dict(payload)
+    if stats.feature_names != tuple(feature_names):
+        return LinearSufficientStats.empty(feature_names)
+    return stats
+
+
+def save_stats(stats: LinearSufficientStats, path: Path) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_json(stats.to_dict(), path)
@@ -1,17 +1,38 @@
 from __future__ import annotations
 
-import json
+import argparse
 from pathlib import Path
 from datetime import datetime
 
 import numpy as np
+import pandas as pd
 
 from gpx_time_prediction_models.training.features import (
+    TARGET_NAME,
     FeatureMatrix,
-    build_training_matrix
+    build_training_matrix,
+    training_frame,
+)
+from gpx_time_prediction_models.training.sufficient_stats import (
+    LinearSufficientStats,
+    load_stats,
+    save_stats,
 )
 from utils import activity as au
 from utils.config import PARQUET_RUN_ACTIVITIES_PATH
+from utils.storage import atomic_write_json
+from utils.summary_store import update_summary_store
+
+STATS_FILE_NAME = "linear_stats.json"
+# Summary store only --incremental refreshes, so every change it reports reaches the stats
+STATS_SUMMARIES_FILE_NAME = "linear_summaries.parquet"
+# Incremental and batch fits must agree to this relative tolerance
+REFIT_RTOL = 1e-8
+# Bootstrap refits kept in the artifact for prediction intervals
+BOOTSTRAP_SAMPLES = 200
+BOOTSTRAP_SEED = 0
+# Incremental bootstraps resample at most this many activities, chosen by path hash
+BOOTSTRAP_RESERVOIR_SIZE = 2000
 
 
 def fit_linear_regression(X: np.ndarray, y: np.ndarray) -> tuple[float, np.ndarray]:
@@ -23,21 +44,120 @@ def fit_linear_regression(X: np.ndarray, y: np.ndarray) -> tuple[float, np.ndarr
     return intercept, weights
 
 
+def bootstrap_ensemble(
+    X: np.ndarray,
+    y: np.ndarray,
+    n_samples: int = BOOTSTRAP_SAMPLES,
+    seed: int = BOOTSTRAP_SEED,
+    resample_size: int | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Refit y = b0 + Xw on `n_samples` bootstrap resamples in one batched solve.
+
+    Returns intercepts, shape (n_samples,), and coefficients, shape
+    (n_samples, n_features). Each intercept also carries one residual drawn
+    from its fit, so the ensemble spread covers run-to-run noise as well as
+    coefficient uncertainty and its quantiles are prediction intervals.
+    Each resample draws `resample_size` rows (default `len(X)`), so a
+    subsample of the history can stand in for all of it at the full
+    history's sample size.
+    """
+    rng = np.random.default_rng(seed)
+    n_rows = len(X)
+    X_design = np.column_stack([np.ones(n_rows), X])
+    # A resample's normal equations are the rows weighted by how often they were drawn
+    counts = rng.multinomial(resample_size or n_rows, np.full(n_rows, 1.0 / n_rows), size=n_samples).astype(float)
+    gram = np.einsum("bn,ni,nj->bij", counts, X_design, X_design)
+    rhs = np.einsum("bn,ni,n->bi", counts, X_design, y)
+    # pinv gives the minimum-norm solution, as lstsq does, when a resample misses a feature
+    coeffs = np.einsum("bij,bj->bi", np.linalg.pinv(gram, hermitian=True), rhs)
+    residuals = y[:, None] - X_design @ coeffs.T
+    noise = residuals[rng.integers(0, n_rows, size=n_samples), np.arange(n_samples)]
+    return coeffs[:, 0] + noise, coeffs[:, 1:]
+
+
+def build_artifact(
+    model_version: str,
+    intercept: float,
+    coefficients: np.ndarray,
+    feature_names: tuple[str, ...],
+    feature_means: np.ndarray,
+    feature_stds: np.ndarray,
+    X: np.ndarray,
+    y: np.ndarray,
+    resample_size: int | None = None,
+) -> dict:
+    """The artifact `CompiledLinearModel` loads, with bootstrap refits on the standardized `X`, `y`."""
+    bootstrap_intercepts, bootstrap_coefficients = bootstrap_ensemble(X, y, resample_size=resample_size)
+    return {
+        "model_version": model_version,
+        "intercept": intercept,
+        "coefficients": np.asarray(coefficients, dtype=float).tolist(),
+        "feature_names": list(feature_names),
+        "feature_means": np.asarray(feature_means, dtype=float).tolist(),
+        "feature_stds": np.asarray(feature_stds, dtype=float).tolist(),
+        "target_name": TARGET_NAME,
+        "bootstrap_intercepts": bootstrap_intercepts.tolist(),
+        "bootstrap_coefficients": bootstrap_coefficients.tolist(),
+    }
+
+
 def train(training_matrix: FeatureMatrix, model_version: str) -> dict:
     intercept, coefficients = fit_linear_regression(
         training_matrix.X, training_matrix.y
     )
+    return build_artifact(
+        model_version,
+        intercept,
+        coefficients,
+        training_matrix.feature_names,
+        training_matrix.feature_means,
+        training_matrix.feature_stds,
+        training_matrix.X,
+        training_matrix.y,
+    )
 
-    artifact = {
-        "model_version": model_version,
-        "intercept": intercept,
-        "coefficients": coefficients.tolist(),
-        "feature_names": list(training_matrix.feature_names),
-        "feature_means": training_matrix.feature_means.tolist(),
-        "feature_stds": training_matrix.feature_stds.tolist(),
-        "target_name": "elapsed_seconds",
-    }
-    return artifact
+
+def bootstrap_reservoir(summaries: pd.DataFrame, size: int = BOOTSTRAP_RESERVOIR_SIZE) -> pd.DataFrame:
+    """Usable training rows of at most `size` activities, indexed by path.
+
+    Picks the activities with the smallest path hashes: a uniform sample that
+    only changes as activities enter or leave it, without storing any rows.
+    """
+    frame = training_frame(summaries.set_index('activity_path'))
+    if len(frame) <= size:
+        return frame
+    hashes = pd.util.hash_array(frame.index.astype(str).to_numpy(dtype=object))
+    return frame.iloc[np.sort(np.argpartition(hashes, size)[:size])]
+
+
+def train_from_stats(stats: LinearSufficientStats, model_version: str, summaries: pd.DataFrame) -> dict:
+    """Point estimate from the sufficient statistics, bootstrap from a bounded reservoir of `summaries`."""
+    intercept, coefficients = stats.solve()
+    means, stds = stats.feature_means(), stats.feature_stds()
+    reservoir = bootstrap_reservoir(summaries)
+    return build_artifact(
+        model_version, intercept, coefficients, stats.feature_names, means, stds,
+        (reservoir[list(stats.feature_names)].to_numpy(dtype=float) - means) / stds,
+        reservoir[TARGET_NAME].to_numpy(dtype=float),
+        resample_size=stats.count,
+    )
+
+
+def check_refit(artifact: dict, training_matrix: FeatureMatrix) -> None:
+    """Raise if `artifact` does not reproduce the batch least-squares fit."""
+    batch = train(training_matrix, artifact["model_version"])
+    for key in ("feature_means", "feature_stds"):
+        if not np.allclose(artifact[key], batch[key], rtol=REFIT_RTOL, atol=0.0):
+            raise RuntimeError(f"Incremental {key} differ from the batch fit")
+    # Compare fitted values rather than coefficients, which are not unique for collinear features
+    X_design = np.column_stack([np.ones(len(training_matrix.X)), training_matrix.X])
+    incremental = X_design @ np.concatenate(([artifact["intercept"]], artifact["coefficients"]))
+    expected = X_design @ np.concatenate(([batch["intercept"]], batch["coefficients"]))
+    scale = max(float(np.abs(expected).max()), 1.0)
+    if not np.allclose(incremental, expected, rtol=0.0, atol=REFIT_RTOL * scale):
+        raise RuntimeError(
+            f"Incremental fit differs from the batch fit by up to {np.abs(incremental - expected).max():.3g}s"
+        )
 
 
 def save(
@@ -45,21 +165,59 @@ def save(
     output_path: Path
 ) -> None:
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(artifact, f, indent=2)
+    # Atomic so serving processes hot-reloading the weights never read a partial file
+    atomic_write_json(artifact, output_path)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Train the linear GPX time model.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Update saved sufficient statistics with new, changed and deleted activities and re-solve",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="With --incremental, also run the batch fit and fail if the two disagree",
+    )
+    return parser.parse_args(argv)
 
 
-def main() -> None:
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
     output_path = Path("gpx_time_prediction_models/artifacts/")
     timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
     model_version = f"linear_v{timestamp}"
 
     weights_file_name = "linear_weights.json"
 
-    activity_summaries_df = au.activities_summary(PARQUET_RUN_ACTIVITIES_PATH)
-    matrix = build_training_matrix(activity_summaries_df)
+    if args.incremental:
+        # The summary store only re-reads new or changed activities, and reports what they held before
+        delta = update_summary_store(PARQUET_RUN_ACTIVITIES_PATH, output_path / STATS_SUMMARIES_FILE_NAME)
+        activity_summaries_df = delta.summaries
+        stats = load_stats(output_path / STATS_FILE_NAME)
+        try:
+            added, removed = stats.apply(delta)
+            current = stats.matches(activity_summaries_df)
+        except ValueError:
+            # Previous rows from before a summary schema change lack the training columns
+            current = False
+        if current:
+            print(f"Sufficient statistics: {added} added or changed, {removed} removed, {stats.count} rows")
+        else:
+            # Missing or older stats, or an earlier run stopped between the store and the stats
+            stats = LinearSufficientStats.from_summaries(activity_summaries_df)
+            print(f"Sufficient statistics rebuilt from {stats.count} rows")
+        artifact = train_from_stats(stats, model_version, activity_summaries_df)
+        if args.check:
+            check_refit(artifact, build_training_matrix(activity_summaries_df))
+        save_stats(stats, output_path / STATS_FILE_NAME)
+    else:
+        activity_summaries_df = au.activities_summary(PARQUET_RUN_ACTIVITIES_PATH)
+        matrix = build_training_matrix(activity_summaries_df)
+        artifact = train(matrix, model_version)
 
-    artifact = train(matrix, model_version)
     save(artifact, output_path / weights_file_name)
     save(artifact, output_path / "backups" / f"{model_version}.json")
 
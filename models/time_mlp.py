@@ -0,0 +1,66 @@
+"""NumPy-only inference for TimeMLP checkpoints.
+
+`models.time_torch.export_numpy` writes the dense layers and feature
+statistics of a trained model to an `.npz` file. This module runs the same
+forward pass (Linear -> ReLU ... -> Linear; dropout is a no-op at inference)
+without importing torch, so prediction scripts start in a fraction of the
+time. Outputs match the torch model to float32 precision.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class NumpyTimeMLP:
+    feature_names: tuple[str, ...]
+    mean: np.ndarray
+    std: np.ndarray
+    weights: tuple[np.ndarray, ...]  # One (out, in) matrix per Linear layer, as in torch
+    biases: tuple[np.ndarray, ...]
+
+    def forward(self, normalized: np.ndarray) -> np.ndarray:
+        """Run the network on already standardized features, shape (n, n_features)."""
+        x = np.asarray(normalized, dtype=np.float32)
+        last = len(self.weights) - 1
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            x = x @ weight.T + bias
+            if i < last:
+                np.maximum(x, 0, out=x)
+        return x[:, 0]
+
+    def predict_many(self, features: np.ndarray) -> np.ndarray:
+        """Predict hours for raw feature rows, columns in `feature_names` order."""
+        features = np.atleast_2d(np.asarray(features, dtype=np.float32))
+        return self.forward((features - self.mean) / self.std)
+
+    def predict_hours(self, features: dict[str, float]) -> float:
+        values = np.array([features[name] for name in self.feature_names], dtype=np.float32)
+        return float(self.predict_many(values)[0])
+
+    def save(self, path: Path) -> None:
+        arrays = {f"weight_{i}": w for i, w in enumerate(self.weights)}
+        arrays.update({f"bias_{i}": b for i, b in enumerate(self.biases)})
+        np.savez(
+            Path(path),
+            feature_names=np.array(self.feature_names),
+            mean=self.mean,
+            std=self.std,
+            **arrays,
+        )
+
+
+def load_model(path: Path) -> NumpyTimeMLP:
+    with np.load(Path(path), allow_pickle=False) as payload:
+        n_layers = sum(1 for key in payload.files if key.startswith("weight_"))
+        return NumpyTimeMLP(
+            feature_names=tuple(str(name) for name in payload["feature_names"]),
+            mean=payload["mean"].astype(np.float32),
+            std=payload["std"].astype(np.float32),
+            weights=tuple(payload[f"weight_{i}"].astype(np.float32) for i in range(n_layers)),
+            biases=tuple(payload[f"bias_{i}"].astype(np.float32) for i in range(n_layers)),
+        )
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from typing import Iterable, Sequence
 
@@ -10,6 +11,7 @@ from torch import nn
 from torch.utils.data import DataLoader, TensorDataset
 
 from models import time_linear
+from models.time_mlp import NumpyTimeMLP
 from utils import activity
 
 @dataclass
@@ -21,6 +23,34 @@ class TrainingConfig:
     epochs: int = 300
     batch_size: int = 32
     device: str = "cpu"
+    # Used by train_time_mlp_fast only
+    full_batch: bool = False  # One optimizer step per epoch on every training row
+    validation_fraction: float = 0.0  # Rows held out for early stopping; 0 trains on everything
+    patience: int | None = None  # Stop after this many epochs without a validation improvement
+    refit: bool = False  # After early stopping, retrain on every row for the best epoch count
+    num_threads: int | None = None  # torch intra-op threads; None keeps torch's default
+    seed: int | None = None
+
+
+# Full-batch steps with early stopping reach the mini-batch loss in about a second
+FAST_TRAINING_CONFIG = TrainingConfig(
+    epochs=3000, lr=5e-3, dropout=0.1,
+    full_batch=True, validation_fraction=0.15, patience=200, refit=True,
+)
+# Settings the saved weights are trained with
+MAIN_TRAINING_CONFIG = TrainingConfig(epochs=400, batch_size=32, lr=5e-4, dropout=0.1)
+
+
+@dataclass(frozen=True)
+class TrainingMetrics:
+    epochs_run: int
+    best_epoch: int  # Epoch whose weights were kept (the last one without early stopping)
+    train_rows: int
+    validation_rows: int
+    num_threads: int
+    seconds: float
+    samples_per_second: float  # Training rows processed per second, forward and backward
+    validation_history: list[float] = field(default_factory=list)
 
 
 class TimeMLP(nn.Module):
@@ -61,14 +91,10 @@ def _build_dataloader(
     return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle)
 
 
-def train_time_mlp(
+def _training_arrays(
     summaries_df,
-    feature_names: Iterable[str] | None = None,
-    config: TrainingConfig | None = None,
-) -> tuple[TimeMLP, dict[str, np.ndarray], list[float]]:
-    if config is None:
-        config = TrainingConfig()
-
+    feature_names: Iterable[str] | None,
+) -> tuple[list[str], np.ndarray, np.ndarray]:
     if feature_names is None:
         feature_names = time_linear.LINEAR_FEATURES
 
@@ -81,7 +107,18 @@ def train_time_mlp(
 
     features = frame[feature_names].to_numpy(dtype=np.float32)
     labels = frame[label_col].to_numpy(dtype=np.float32)
+    return feature_names, features, labels
+
+
+def train_time_mlp(
+    summaries_df,
+    feature_names: Iterable[str] | None = None,
+    config: TrainingConfig | None = None,
+) -> tuple[TimeMLP, dict[str, np.ndarray], list[float]]:
+    if config is None:
+        config = TrainingConfig()
 
+    feature_names, features, labels = _training_arrays(summaries_df, feature_names)
     normalized, mean, std = _standardize(features)
 
     device = torch.device(config.device)
@@ -119,6 +156,123 @@ def train_time_mlp(
     return model, stats, history
 
 
+def train_time_mlp_fast(
+    summaries_df,
+    feature_names: Iterable[str] | None = None,
+    config: TrainingConfig | None = None,
+) -> tuple[TimeMLP, dict[str, np.ndarray], list[float], TrainingMetrics]:
+    """Train like `train_time_mlp` with the whole dataset resident as tensors.
+
+    Each epoch slices one pre-shuffled index permutation into batches (or
+    takes a single full-batch step), so there is no DataLoader, per-batch
+    device copy or per-batch `.item()` sync. With `validation_fraction` and
+    `patience`, training stops once the held-out loss stops improving and
+    the best weights are restored. Normalization stats come from the
+    training rows only. With `refit`, a fresh model is then trained on
+    every row for the number of epochs early stopping picked.
+    """
+    if config is None:
+        config = TrainingConfig()
+
+    feature_names, features, labels = _training_arrays(summaries_df, feature_names)
+    generator = torch.Generator()
+    if config.seed is not None:
+        generator.manual_seed(config.seed)
+        torch.manual_seed(config.seed)
+
+    order = torch.randperm(len(features), generator=generator).numpy()
+    n_validation = int(len(features) * config.validation_fraction)
+    if n_validation and len(features) - n_validation < 1:
+        raise ValueError("validation_fraction leaves no rows to train on")
+    validation_idx, train_idx = order[:n_validation], order[n_validation:]
+
+    normalized, mean, std = _standardize(features[train_idx])
+    device = torch.device(config.device)
+    train_x = torch.from_numpy(normalized).float().to(device)
+    train_y = torch.from_numpy(labels[train_idx]).float().to(device)
+    validation_x = torch.from_numpy((features[validation_idx] - mean) / std).float().to(device)
+    validation_y = torch.from_numpy(labels[validation_idx]).float().to(device)
+
+    model = TimeMLP(input_dim=train_x.shape[1], hidden_sizes=config.hidden_sizes, dropout=config.dropout)
+    model.to(device)
+    optimizer = torch.optim.Adam(model.parameters(), lr=config.lr, weight_decay=config.weight_decay)
+    criterion = nn.MSELoss()
+
+    previous_threads = torch.get_num_threads()
+    if config.num_threads is not None:
+        torch.set_num_threads(config.num_threads)
+    n_train = len(train_x)
+    batch_size = n_train if config.full_batch else config.batch_size
+    # Per-epoch losses stay on the device and are read back once at the end
+    epoch_losses = torch.zeros(config.epochs, device=device)
+    validation_history: list[float] = []
+    best_loss, best_epoch, best_state = float("inf"), 0, None
+    epochs_run = 0
+    start = time.perf_counter()
+    try:
+        for epoch in range(config.epochs):
+            model.train()
+            permutation = torch.randperm(n_train, generator=generator).to(device)
+            for batch_start in range(0, n_train, batch_size):
+                idx = permutation[batch_start:batch_start + batch_size]
+                optimizer.zero_grad(set_to_none=True)
+                loss = criterion(model(train_x[idx]), train_y[idx])
+                loss.backward()
+                optimizer.step()
+                epoch_losses[epoch] += loss.detach() * len(idx)
+            epochs_run = epoch + 1
+
+            if not n_validation:
+                continue
+            model.eval()
+            with torch.no_grad():
+                validation_loss = criterion(model(validation_x), validation_y).item()
+            validation_history.append(validation_loss)
+            if validation_loss < best_loss:
+                best_loss, best_epoch = validation_loss, epoch
+                best_state = {key: value.detach().clone() for key, value in model.state_dict().items()}
+            elif config.patience is not None and epoch - best_epoch >= config.patience:
+                break
+        seconds = time.perf_counter() - start
+    finally:
+        torch.set_num_threads(previous_threads)
+
+    if best_state is not None:
+        model.load_state_dict(best_state)
+    else:
+        best_epoch = epochs_run - 1
+    model.eval()
+
+    history = (epoch_losses[:epochs_run] / n_train).tolist()
+    metrics = TrainingMetrics(
+        epochs_run=epochs_run,
+        best_epoch=best_epoch,
+        train_rows=n_train,
+        validation_rows=n_validation,
+        num_threads=config.num_threads or previous_threads,
+        seconds=seconds,
+        samples_per_second=epochs_run * n_train / seconds if seconds > 0 else float("inf"),
+        validation_history=validation_history,
+    )
+    stats = {
+        "feature_names": np.array(feature_names),
+        "mean": mean,
+        "std": std,
+    }
+    if config.refit and n_validation:
+        refit_config = replace(
+            config, epochs=best_epoch + 1, validation_fraction=0.0, patience=None, refit=False
+        )
+        model, stats, history, refit_metrics = train_time_mlp_fast(summaries_df, feature_names, refit_config)
+        metrics = replace(
+            refit_metrics,
+            best_epoch=best_epoch,
+            seconds=seconds + refit_metrics.seconds,
+            validation_history=validation_history,
+        )
+    return model, stats, history, metrics
+
+
 def save_model(model: TimeMLP, stats: dict[str, np.ndarray], path: Path) -> None:
     path = Path(path)
     payload = {
@@ -130,6 +284,33 @@ def save_model(model: TimeMLP, stats: dict[str, np.ndarray], path: Path) -> None
     torch.save(payload, path)
 
 
+def to_numpy(model: TimeMLP, stats: dict[str, np.ndarray]) -> NumpyTimeMLP:
+    """Copy the dense layers and feature stats into a torch-free model."""
+    linears = [layer for layer in model.network if isinstance(layer, nn.Linear)]
+    return NumpyTimeMLP(
+        feature_names=tuple(str(name) for name in stats["feature_names"]),
+        mean=np.asarray(stats["mean"], dtype=np.float32),
+        std=np.asarray(stats["std"], dtype=np.float32),
+        weights=tuple(layer.weight.detach().cpu().numpy().astype(np.float32) for layer in linears),
+        biases=tuple(layer.bias.detach().cpu().numpy().astype(np.float32) for layer in linears),
+    )
+
+
+def export_numpy(model: TimeMLP, stats: dict[str, np.ndarray], path: Path) -> NumpyTimeMLP:
+    """Write the dense layers and feature stats to an .npz for torch-free inference."""
+    exported = to_numpy(model, stats)
+    exported.save(path)
+    return exported
+
+
+def export_checkpoint(checkpoint_path: Path, path: Path | None = None) -> Path:
+    """Export a saved torch checkpoint next to itself (or to `path`) as .npz."""
+    path = Path(path) if path is not None else Path(checkpoint_path).with_suffix(".npz")
+    model, stats = load_model(checkpoint_path)
+    export_numpy(model, stats, path)
+    return path
+
+
 def load_model(path: Path, device: str | None = None) -> tuple[TimeMLP, dict[str, np.ndarray]]:
     checkpoint = torch.load(Path(path), map_location=device or "cpu", weights_only=False)
     feature_names = checkpoint["feature_names"]
@@ -173,10 +354,16 @@ def main() -> None:
     WEIGHTS_PATH = Path('./models/weights/time_mlp_weights.pt')
 
     summaries = activity.load_activity_summaries(ACTIVITY_DIR)
-    config = TrainingConfig(epochs=400, batch_size=32, lr=5e-4, dropout=0.1)
-    model, stats, history = train_time_mlp(summaries, config=config)
+    model, stats, history, metrics = train_time_mlp_fast(summaries, config=MAIN_TRAINING_CONFIG)
+    print(
+        f"Trained {metrics.epochs_run} epochs on {metrics.train_rows} rows in {metrics.seconds:.2f}s "
+        f"({metrics.samples_per_second:,.0f} samples/s, {metrics.num_threads} threads)"
+    )
+    if metrics.validation_history:
+        print(f"Best validation MSE {min(metrics.validation_history):.4f} at epoch {metrics.best_epoch}")
 
     save_model(model, stats, WEIGHTS_PATH)
+    export_numpy(model, stats, WEIGHTS_PATH.with_suffix('.npz'))
     plot_training_loss(history)
 
 
@@ -0,0 +1,295 @@
+"""
+Benchmarks for the data pipelines, run against synthetic inputs built from the
+sample files in `data/`.
+
+Usage:
+    python -m scripts.benchmark ingestion [--copies 16] [--workers 4]
+    python -m scripts.benchmark fit-decode [--fit-file path/to/activity.fit]
+    python -m scripts.benchmark sport-sniff [--fit-file path/to/activity.fit]
+    python -m scripts.benchmark gpx-distance [--gpx-file path/to/route.gpx] [--densify 10]
+    python -m scripts.benchmark gpx-parse [--gpx-file path/to/route.gpx] [--segments 30]
+    python -m scripts.benchmark best-efforts [--fit-file path/to/activity.fit] [--copies 4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import geopy.distance
+import gpxpy
+import numpy as np
+import pandas as pd
+from fitparse import FitFile
+
+from scripts import fit_ingestion
+from utils import best_efforts
+from utils import fit as fit_utils
+from utils import gpx as gpx_utils
+from utils.geodesic import segment_lengths
+
+SAMPLE_FIT_FILE = Path("data/2025-06-30-15-07-06.fit")
+SAMPLE_GPX_FILE = Path("data/gpx_routes/tower_oab.gpx")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark data pipeline stages.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    ingestion = subparsers.add_parser("ingestion", help="Serial vs process-pool FIT ingestion")
+    ingestion.add_argument("--copies", type=int, default=16, help="Number of .fit files in the synthetic archive")
+    ingestion.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes for the parallel run")
+    ingestion.add_argument("--fit-file", type=Path, default=SAMPLE_FIT_FILE, help="Template .fit file")
+
+    fit_decode = subparsers.add_parser("fit-decode", help="fitparse dict rows vs columnar .fit decoding")
+    fit_decode.add_argument("--fit-file", type=Path, default=SAMPLE_FIT_FILE, help=".fit file to decode")
+
+    sport_sniff = subparsers.add_parser("sport-sniff", help="Sport sniffing vs full single-pass decode")
+    sport_sniff.add_argument("--fit-file", type=Path, default=SAMPLE_FIT_FILE, help=".fit file to read")
+    sport_sniff.add_argument("--repeat", type=int, default=20, help="Number of timed repetitions")
+
+    gpx_distance = subparsers.add_parser("gpx-distance", help="geopy per-pair loop vs vectorized segment lengths")
+    gpx_distance.add_argument("--gpx-file", type=Path, default=SAMPLE_GPX_FILE, help="Route to measure")
+    gpx_distance.add_argument("--densify", type=int, default=10, help="Interpolated points per segment, to mimic long routes")
+
+    gpx_parse = subparsers.add_parser("gpx-parse", help="gpxpy object tree vs streaming GPX parsing")
+    gpx_parse.add_argument("--gpx-file", type=Path, default=SAMPLE_GPX_FILE, help="Template route")
+    gpx_parse.add_argument("--segments", type=int, default=30, help="Copies of the track segment, to mimic a multi-day export")
+
+    efforts = subparsers.add_parser("best-efforts", help="searchsorted vs two-pointer window starts for best efforts")
+    efforts.add_argument("--fit-file", type=Path, default=SAMPLE_FIT_FILE, help="Template activity")
+    efforts.add_argument("--copies", type=int, default=4, help="Back-to-back copies of the activity, to mimic a long one")
+    efforts.add_argument("--repeat", type=int, default=5, help="Number of timed repetitions")
+    return parser.parse_args(argv)
+
+
+def build_synthetic_archive(template: Path, directory: Path, copies: int) -> list[Path]:
+    """Copy a template .fit file into `directory` under distinct names."""
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(copies):
+        path = directory / f"synthetic-{i:05d}.fit"
+        shutil.copyfile(template, path)
+        paths.append(path)
+    return paths
+
+
+def _digests(directory: Path) -> dict[str, str]:
+    return {
+        p.name: hashlib.sha256(p.read_bytes()).hexdigest()
+        for p in sorted(directory.glob("*.parquet"))
+    }
+
+
+def _timed(func, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def _timed_peak(func, *args, **kwargs) -> tuple[float, float, object]:
+    """Return (seconds, peak MB, result) for one call."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6, result
+
+
+def bench_ingestion(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        files = build_synthetic_archive(args.fit_file, tmp_dir / "fit", args.copies)
+        serial_dir = tmp_dir / "serial"
+        parallel_dir = tmp_dir / "parallel"
+        serial_dir.mkdir()
+        parallel_dir.mkdir()
+
+        # Only the conversion phase: manifest and sketch updates are serial and would dilute the speedup
+        serial_s = _timed(fit_ingestion.convert_fit_files, files, serial_dir, 1)
+        parallel_s = _timed(fit_ingestion.convert_fit_files, files, parallel_dir, args.workers)
+
+        identical = _digests(serial_dir) == _digests(parallel_dir)
+        print(f"\nfiles           : {len(files)}")
+        print(f"serial          : {serial_s:.2f}s ({len(files) / serial_s:.1f} files/s)")
+        print(f"workers={args.workers:<7d}: {parallel_s:.2f}s ({len(files) / parallel_s:.1f} files/s)")
+        print(f"speedup         : {serial_s / parallel_s:.2f}x")
+        print(f"byte-identical  : {identical}")
+
+
+def bench_fit_decode(args: argparse.Namespace) -> None:
+    fitparse_s, fitparse_mb, fitparse_df = _timed_peak(
+        lambda: fit_utils.fit_to_df(FitFile(str(args.fit_file)))
+    )
+    columnar_s, columnar_mb, columnar_df = _timed_peak(fit_utils.fit_to_df, args.fit_file)
+
+    print(f"records         : {len(columnar_df)}")
+    print(f"fitparse rows   : {fitparse_s:.3f}s, peak {fitparse_mb:.1f} MB")
+    print(f"columnar        : {columnar_s:.3f}s, peak {columnar_mb:.1f} MB")
+    print(f"speedup         : {fitparse_s / columnar_s:.1f}x time, {fitparse_mb / columnar_mb:.1f}x memory")
+    print(f"identical frame : {fitparse_df.equals(columnar_df) and list(fitparse_df.dtypes) == list(columnar_df.dtypes)}")
+
+
+def bench_sport_sniff(args: argparse.Namespace) -> None:
+    data = args.fit_file.read_bytes()
+    # From the path, so only the bytes the scan needs are read
+    sniff_s = _timed(lambda: [fit_utils.sniff_sport(args.fit_file) for _ in range(args.repeat)]) / args.repeat
+    full_s = _timed(lambda: [fit_utils.extract_fit_activity(data) for _ in range(args.repeat)]) / args.repeat
+
+    print(f"sport           : {fit_utils.sniff_sport(data)}")
+    print(f"sniff_sport     : {sniff_s * 1000:.2f} ms/file")
+    print(f"full decode     : {full_s * 1000:.2f} ms/file")
+    print(f"speedup         : {full_s / sniff_s:.0f}x")
+
+
+def _densify(values: np.ndarray, factor: int) -> np.ndarray:
+    steps = np.arange(factor) / factor
+    return np.concatenate([(values[:-1, None] + np.diff(values)[:, None] * steps).ravel(), values[-1:]])
+
+
+def bench_gpx_distance(args: argparse.Namespace) -> None:
+    df = gpx_utils.gpx_to_df(args.gpx_file)
+    lat = _densify(df['position_lat'].to_numpy(), args.densify)
+    lon = _densify(df['position_long'].to_numpy(), args.densify)
+    coords = list(zip(lat, lon))
+
+    geopy_s = _timed(lambda: [geopy.distance.distance(a, b).m for a, b in zip(coords[:-1], coords[1:])])
+    reference = np.array([geopy.distance.distance(a, b).m for a, b in zip(coords[:-1], coords[1:])])
+    geodesic_s = _timed(segment_lengths, lat, lon)
+    haversine_s = _timed(segment_lengths, lat, lon, "haversine")
+    geodesic = segment_lengths(lat, lon)
+    haversine = segment_lengths(lat, lon, "haversine")
+
+    print(f"points          : {len(lat)}")
+    print(f"geopy loop      : {geopy_s:.3f}s")
+    print(f"geodesic        : {geodesic_s * 1000:.2f} ms ({geopy_s / geodesic_s:.0f}x), "
+          f"max segment error {np.abs(geodesic - reference).max():.1e} m")
+    print(f"haversine       : {haversine_s * 1000:.2f} ms ({geopy_s / haversine_s:.0f}x), "
+          f"total error {(haversine.sum() - reference.sum()) / reference.sum():+.3%}")
+
+
+def build_multi_day_gpx(template: Path, path: Path, segments: int) -> None:
+    """Write a GPX whose single track repeats the template's first segment."""
+    text = template.read_text()
+    segment = re.search(r"<trkseg>.*?</trkseg>", text, re.S).group(0)
+    path.write_text(text[:text.index("<trk>")] + "<trk>" + segment * segments + "</trk></gpx>")
+
+
+def _gpxpy_tree(path: Path) -> int:
+    with open(path, "r") as f:
+        gpx = gpxpy.parse(f)
+    return sum(len(segment.points) for track in gpx.tracks for segment in track.segments)
+
+
+def bench_gpx_parse(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "multi_day.gpx"
+        build_multi_day_gpx(args.gpx_file, path, args.segments)
+
+        gpxpy_s = _timed(_gpxpy_tree, path)
+        streaming_s = _timed(gpx_utils.read_gpx_points, path)
+        _, gpxpy_mb, points = _timed_peak(_gpxpy_tree, path)
+        _, streaming_mb, df = _timed_peak(gpx_utils.read_gpx_points, path)
+
+        print(f"file            : {path.stat().st_size / 1e6:.1f} MB, {len(df)} points")
+        print(f"gpxpy           : {gpxpy_s:.2f}s, peak {gpxpy_mb:.1f} MB")
+        print(f"streaming       : {streaming_s:.2f}s, peak {streaming_mb:.1f} MB")
+        print(f"speedup         : {gpxpy_s / streaming_s:.1f}x time, {gpxpy_mb / streaming_mb:.1f}x memory")
+        print(f"same points     : {points == len(df)}")
+
+
+def build_long_activity(template: Path, copies: int) -> pd.DataFrame:
+    """The template activity run `copies` times back to back, as one activity."""
+    df = fit_utils.standardize_fit_df(fit_utils.fit_to_df(template))[best_efforts.EFFORT_COLUMNS]
+    parts = []
+    for i in range(copies):
+        part = df.copy()
+        part['elapsed_seconds'] += i * (df['elapsed_seconds'].iloc[-1] + 1)
+        part['distance'] += i * df['distance'].max()
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+def _two_pointer_starts(axis: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    # Both arrays are non-decreasing, so the start pointer only moves forward: O(n) per window
+    starts = np.empty(len(targets), dtype=np.int64)
+    values = axis.tolist()
+    i = 0
+    for j, target in enumerate(targets.tolist()):
+        while i < len(values) and values[i] <= target:
+            i += 1
+        starts[j] = i - 1
+    return starts
+
+
+def _merge_starts(axis: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    # The same sweep as one stable merge; axis first so ties land before their target
+    order = np.argsort(np.concatenate((axis, targets)), kind='stable')
+    is_target = order >= len(axis)
+    return np.cumsum(~is_target)[is_target] - 1
+
+
+def _window_deltas_with(starts_func):
+    def window_deltas(axis: np.ndarray, cumulative: np.ndarray, span: float) -> np.ndarray:
+        targets = axis - span
+        ends = np.flatnonzero(targets >= axis[0])
+        if not len(ends):
+            return np.empty(0)
+        targets = targets[ends]
+        starts = starts_func(axis, targets)
+        nxt = np.minimum(starts + 1, len(axis) - 1)
+        step = axis[nxt] - axis[starts]
+        frac = np.divide(targets - axis[starts], step, out=np.zeros_like(targets), where=step > 0)
+        return cumulative[ends] - (cumulative[starts] + frac * (cumulative[nxt] - cumulative[starts]))
+    return window_deltas
+
+
+def bench_best_efforts(args: argparse.Namespace) -> None:
+    df = build_long_activity(args.fit_file, args.copies)
+    searchsorted = best_efforts._window_deltas
+    results = {}
+    timings = {}
+    try:
+        for name, window_deltas in (
+            ("searchsorted", searchsorted),
+            ("two-pointer", _window_deltas_with(_two_pointer_starts)),
+            ("stable merge", _window_deltas_with(_merge_starts)),
+        ):
+            best_efforts._window_deltas = window_deltas
+            timings[name] = _timed(
+                lambda: [best_efforts.activity_best_efforts(df) for _ in range(args.repeat)]
+            ) / args.repeat
+            results[name] = best_efforts.activity_best_efforts(df)
+    finally:
+        best_efforts._window_deltas = searchsorted
+
+    print(f"samples         : {len(df)}")
+    for name, seconds in timings.items():
+        print(f"{name:<16}: {seconds * 1000:.1f} ms/activity")
+    reference = pd.Series(results["searchsorted"])
+    same = all(np.allclose(pd.Series(r), reference, rtol=0, atol=1e-9, equal_nan=True) for r in results.values())
+    print(f"same efforts    : {same}")
+
+
+BENCHMARKS = {
+    "ingestion": bench_ingestion,
+    "fit-decode": bench_fit_decode,
+    "sport-sniff": bench_sport_sniff,
+    "gpx-distance": bench_gpx_distance,
+    "gpx-parse": bench_gpx_parse,
+    "best-efforts": bench_best_efforts,
+}
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    BENCHMARKS[args.benchmark](args)
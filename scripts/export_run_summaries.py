@@ -1,21 +1,30 @@
 import datetime
 import pandas as pd
 
-from utils.activity import activities_summary
-from utils.config import DATA_PATH, PARQUET_RUN_ACTIVITIES_PATH
+from utils.config import DATA_PATH, PARQUET_RUN_ACTIVITIES_PATH, ZONE_SECONDS_PATH
+from utils.summary_store import SUMMARY_STORE_FILE_NAME, update_summary_store
+from utils.zones import update_zone_seconds
 
 def main() -> None:
-    summaries = activities_summary(PARQUET_RUN_ACTIVITIES_PATH)
-    df = pd.DataFrame(summaries)
+    delta = update_summary_store(PARQUET_RUN_ACTIVITIES_PATH, DATA_PATH / SUMMARY_STORE_FILE_NAME)
+    df = pd.DataFrame(delta.summaries)
 
     filename = DATA_PATH / f"run_summaries.csv"
     df.to_csv(filename, index=False)
-    print(f"Exported run activity summaries to {filename}")
+    print(f"Exported {len(df)} run activity summaries to {filename} ({len(delta.changes)} changed)")
 
+    # The effort zone page reads this table and never refreshes it itself
+    zone_table = update_zone_seconds(PARQUET_RUN_ACTIVITIES_PATH, ZONE_SECONDS_PATH)
+    print(f"Refreshed time in zone for {len(zone_table)} activities in {ZONE_SECONDS_PATH}")
+
+    if not delta.changed:
+        return
+    # Backups hold only what changed since the previous export
     timestamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
     backup_filename = DATA_PATH / f"backups/run_summaries_{timestamp}.csv"
-    df.to_csv(backup_filename, index=False)
-    print(f"Exported backup run activity summaries to {backup_filename}")
+    backup_filename.parent.mkdir(parents=True, exist_ok=True)
+    delta.changes.to_csv(backup_filename, index=False)
+    print(f"Exported backup of changed run activity summaries to {backup_filename}")
 
 
 if __name__ == '__main__':
@@ -1,17 +1,36 @@
 """
 Run from the command line to ingest Garmin .fit activity files and convert to Parquet format.
 Usage (from project root):
-    python -m scripts.fit_ingestion [--source <fit_files_dir>] [--destination <parquet_output_dir>] [--mode <replace|incremental>]
+    python -m scripts.fit_ingestion [--source <fit_files_dir>] [--destination <parquet_output_dir>] [--mode <replace|incremental>] [--workers <n>] [--compact] [--semicircles] [--archive [<archive_dir>]]
+    python -m scripts.fit_ingestion [--source <fit_files_dir>] [--destination <parquet_output_dir>] --rebuild-manifest | --verify-manifest
+    python -m scripts.fit_ingestion [--destination <parquet_output_dir>] --rebuild-archive [--archive <archive_dir>]
+    python -m scripts.fit_ingestion [--destination <parquet_output_dir>] --rebuild-sketches
 """
 
 import argparse
 import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
-from fitparse import FitFile
+import pandas as pd
 
+from utils import archive
 from utils import fit as fit_utils
-from utils.config import GARMIN_FIT_FILES_PATH, PARQUET_RUN_ACTIVITIES_PATH
+from utils.activity import summarize_activity, summary_metadata
+from utils.config import ACTIVITY_ARCHIVE_PATH, GARMIN_FIT_FILES_PATH, PARQUET_RUN_ACTIVITIES_PATH
+from utils.manifest import (
+    CONVERTED,
+    SKIPPED,
+    ManifestEntry,
+    load_manifest,
+    manifest_path,
+    prune_missing_sources,
+    save_manifest,
+)
+from utils import sketches
+from utils.storage import atomic_write_parquet
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -37,9 +56,58 @@ def parse_args() -> argparse.Namespace:
         default="incremental",
         help=(
             "'replace' clears the destination directory before ingesting. "
-            "'incremental' only ingests .fit files that are missing in the destination."
+            "'incremental' only ingests .fit files that are new or changed since the last run."
         )
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes used to decode .fit files (default 1, serial)."
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Store parquet with compact dtypes (small ints, float32, categoricals) instead of float64/object."
+    )
+    parser.add_argument(
+        "--semicircles",
+        action="store_true",
+        help="Keep position_lat/position_long as int32 semicircles instead of float64 degrees."
+    )
+    parser.add_argument(
+        "--archive",
+        type=Path,
+        nargs="?",
+        const=ACTIVITY_ARCHIVE_PATH,
+        default=None,
+        help=(
+            "Also write converted runs into the partitioned activity archive "
+            "(defaults to ACTIVITY_ARCHIVE_PATH from config when given without a directory)."
+        )
+    )
+    manifest_action = parser.add_mutually_exclusive_group()
+    manifest_action.add_argument(
+        "--rebuild-manifest",
+        action="store_true",
+        help="Recreate the ingestion manifest from the source files and existing parquet, then exit."
+    )
+    manifest_action.add_argument(
+        "--verify-manifest",
+        action="store_true",
+        help="Check the ingestion manifest against the source files and destination, then exit."
+    )
+    manifest_action.add_argument(
+        "--rebuild-archive",
+        action="store_true",
+        help="Recreate the activity archive from the parquet files in the destination, then exit."
+    )
+    manifest_action.add_argument(
+        "--rebuild-sketches",
+        action="store_true",
+        help="Recompute the archive-wide distribution sketches from the parquet files in the destination, then exit."
+    )
     return parser.parse_args()
 
 
@@ -61,51 +129,253 @@ def ensure_directories(
     destination_dir.mkdir(parents=True, exist_ok=True)
 
 
+def clear_archive(archive_dir: Path) -> None:
+    for partition in archive_dir.glob("year=*"):
+        shutil.rmtree(partition)
+
+
 def existing_parquet_stems(destination_dir: Path) -> set[str]:
     return {parquet_file.stem for parquet_file in destination_dir.glob("*.parquet")}
 
 
+def ingest_fit_file(
+    fit_file: Path,
+    destination_dir: Path,
+    compact: bool = False,
+    semicircles: bool = False,
+) -> ManifestEntry:
+    """Convert one .fit file to parquet if it is a run, returning its manifest entry."""
+    data = fit_file.read_bytes()
+    sport, sub_sport = fit_utils.sniff_sport(data)
+    if sport != "running":
+        return ManifestEntry.from_bytes(fit_file, data, sport, sub_sport, SKIPPED)
+
+    activity = fit_utils.extract_fit_activity(data)
+    df = fit_utils.standardize_fit_df(activity.records, compact=compact, semicircles=semicircles)
+    df['origin_file_name'] = pd.Categorical([fit_file.name] * len(df)) if compact else fit_file.name
+    parquet_file = destination_dir / f"{fit_file.stem}.parquet"
+    summary = summarize_activity(parquet_file, df)
+    atomic_write_parquet(df, parquet_file, metadata=summary_metadata(summary) if summary else None)
+    return ManifestEntry.from_bytes(fit_file, data, activity.sport, activity.sub_sport, CONVERTED)
+
+
+def _convert_or_error(
+    fit_file: Path,
+    destination_dir: Path,
+    compact: bool = False,
+    semicircles: bool = False,
+) -> ManifestEntry | str:
+    # One corrupt file must not abort the pool run and lose every other file's manifest entry
+    try:
+        return ingest_fit_file(fit_file, destination_dir, compact=compact, semicircles=semicircles)
+    except Exception as exc:
+        return f"{type(exc).__name__}: {exc}"
+
+
+def convert_fit_files(
+    fit_files: list[Path],
+    destination_dir: Path,
+    workers: int = 1,
+    compact: bool = False,
+    semicircles: bool = False,
+) -> list[ManifestEntry | str]:
+    """Convert `fit_files`, serially or on a process pool, returning each file's manifest entry or error message."""
+    convert = partial(_convert_or_error, destination_dir=destination_dir, compact=compact, semicircles=semicircles)
+    if workers > 1 and len(fit_files) > 1:
+        # Small chunks keep long and short activities balanced across workers
+        chunksize = max(1, len(fit_files) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(convert, fit_files, chunksize=chunksize))
+    return [convert(fit_file) for fit_file in fit_files]
+
+
+def _adopt_existing(fit_file: Path) -> ManifestEntry:
+    # Parquet written before the manifest existed: record it without re-converting
+    data = fit_file.read_bytes()
+    sport, sub_sport = fit_utils.sniff_sport(data)
+    return ManifestEntry.from_bytes(fit_file, data, sport, sub_sport, CONVERTED)
+
+
 def ingest_fit_files(
     activity_files: list[Path],
     destination_dir: Path,
-    mode: str
-) -> None:
-    transformed_count = 0
-    skipped_count = 0
+    mode: str,
+    workers: int = 1,
+    archive_dir: Path | None = None,
+    compact: bool = False,
+    semicircles: bool = False,
+) -> tuple[int, int]:
+    manifest_file = manifest_path(destination_dir)
+    manifest = load_manifest(manifest_file) if mode == "incremental" else {}
+    pruned = prune_missing_sources(manifest)
     existing_files = existing_parquet_stems(destination_dir) if mode == "incremental" else set()
 
+    unchanged_count = 0
+    pending_files = []
     for fit_file in activity_files:
-        if mode == "incremental" and fit_file.stem in existing_files:
-            skipped_count += 1
-            continue
+        if mode == "incremental":
+            entry = manifest.get(fit_file.name)
+            if entry is None and fit_file.stem in existing_files:
+                manifest[fit_file.name] = _adopt_existing(fit_file)
+                unchanged_count += 1
+                continue
+            current = entry.refresh(fit_file) if entry is not None else None
+            if current is not None and current.outcome == CONVERTED and fit_file.stem not in existing_files:
+                # Source unchanged but its parquet was deleted: convert it again
+                current = None
+            if current is not None:
+                manifest[fit_file.name] = current
+                unchanged_count += 1
+                continue
+        pending_files.append(fit_file)
 
-        fit = FitFile(str(fit_file))
-        sport, sub_sport = fit_utils.get_sport(fit)
+    results = convert_fit_files(pending_files, destination_dir, workers, compact=compact, semicircles=semicircles)
 
-        if sport != "running":
-            skipped_count += 1
+    converted_stems = []
+    new_stems = []
+    dropped_stems = []
+    failed = []
+    for fit_file, entry in zip(pending_files, results):
+        if isinstance(entry, str):
+            # Left as it was in the manifest so the next run retries it
+            failed.append(fit_file.name)
+            sys.stderr.write(f"[warn] Could not convert {fit_file}: {entry}\n")
             continue
+        previous = manifest.get(fit_file.name)
+        if entry.outcome == CONVERTED:
+            converted_stems.append(fit_file.stem)
+            if previous is None or previous.outcome != CONVERTED:
+                new_stems.append(fit_file.stem)
+        elif previous is not None and previous.outcome == CONVERTED:
+            # Re-synced file is no longer a run, drop its stale parquet
+            (destination_dir / f"{fit_file.stem}.parquet").unlink(missing_ok=True)
+            dropped_stems.append(fit_file.stem)
+        manifest[fit_file.name] = entry
+    transformed_count = len(converted_stems)
+    skipped_count = len(results) - transformed_count - len(failed)
 
-        fit_df = fit_utils.fit_to_df(fit)
-        df = fit_utils.standardize_fit_df(fit_df)
-        df['origin_file_name'] = fit_file.name
-        df.to_parquet(destination_dir / f"{fit_file.stem}.parquet", index=False)
-        transformed_count += 1
+    if archive_dir is not None:
+        if mode == "replace":
+            clear_archive(archive_dir)
+        archive.remove_activities(archive_dir, dropped_stems)
+        archive.build_archive((destination_dir / f"{stem}.parquet" for stem in converted_stems), archive_dir)
+    save_manifest(manifest, manifest_file)
+    # Sketches cannot subtract a run, so replaced or dropped runs mean recomputing them
+    replaced = mode == "replace" or len(new_stems) < len(converted_stems) or bool(dropped_stems)
+    update_sketches(destination_dir, new_stems, rebuild=replaced)
 
     print(f"{transformed_count} run activities converted to Parquet in {destination_dir}. ")
     print(f"Skipped {skipped_count} non-running activities.")
+    if mode == "incremental":
+        print(f"Skipped {unchanged_count} unchanged files already in the manifest.")
+        if pruned:
+            print(f"Pruned {len(pruned)} manifest entries whose .fit file no longer exists.")
+    if failed:
+        print(f"Failed to convert {len(failed)} files; they will be retried on the next run.")
+    if archive_dir is not None:
+        print(f"Updated {transformed_count} activities in archive {archive_dir}.")
+    return transformed_count, skipped_count + unchanged_count
+
+
+def update_sketches(destination_dir: Path, new_stems: list[str], rebuild: bool) -> None:
+    """Fold newly converted runs into the distribution sketches, or recompute them when a run was replaced or dropped."""
+    sketch_file = sketches.sketches_path(destination_dir)
+    if rebuild or sketches.load_sketches(sketch_file) is None:
+        sketches.rebuild_sketches(destination_dir, sketch_file)
+    elif new_stems:
+        sketches.add_activities(sketch_file, (destination_dir / f"{stem}.parquet" for stem in new_stems))
+
+
+def rebuild_manifest(activity_files: list[Path], destination_dir: Path) -> None:
+    """Recreate the manifest from the source files and existing parquet, without converting."""
+    existing_files = existing_parquet_stems(destination_dir)
+    manifest: dict[str, ManifestEntry] = {}
+    for fit_file in activity_files:
+        data = fit_file.read_bytes()
+        sport, sub_sport = fit_utils.sniff_sport(data)
+        if sport == "running":
+            if fit_file.stem not in existing_files:
+                # Left out so the next incremental run converts it
+                continue
+            outcome = CONVERTED
+        else:
+            outcome = SKIPPED
+        manifest[fit_file.name] = ManifestEntry.from_bytes(fit_file, data, sport, sub_sport, outcome)
+    save_manifest(manifest, manifest_path(destination_dir))
+    print(f"Rebuilt manifest with {len(manifest)} entries in {manifest_path(destination_dir)}")
+
+
+def rebuild_archive(destination_dir: Path, archive_dir: Path) -> None:
+    """Recreate the activity archive from every parquet file in the destination."""
+    clear_archive(archive_dir)
+    count = archive.build_archive(destination_dir.glob("*.parquet"), archive_dir)
+    print(f"Rebuilt archive with {count} activities in {archive_dir}")
+
+
+def verify_manifest(activity_files: list[Path], destination_dir: Path) -> list[str]:
+    """Return a list of problems where the manifest disagrees with the source or destination.
+
+    Entries whose source .fit file is gone are pruned from the saved manifest
+    and reported once.
+    """
+    manifest = load_manifest(manifest_path(destination_dir))
+    pruned = prune_missing_sources(manifest)
+    if pruned:
+        save_manifest(manifest, manifest_path(destination_dir))
+    existing_files = existing_parquet_stems(destination_dir)
+    problems = [f"{name}: source file no longer exists, pruned from manifest" for name in pruned]
+    for fit_file in activity_files:
+        entry = manifest.get(fit_file.name)
+        if entry is None:
+            problems.append(f"{fit_file.name}: not in manifest")
+        elif entry.refresh(fit_file) is None:
+            problems.append(f"{fit_file.name}: contents changed since ingestion")
+        elif entry.outcome == CONVERTED and fit_file.stem not in existing_files:
+            problems.append(f"{fit_file.name}: converted but parquet is missing")
+    recorded = {Path(name).stem for name, e in manifest.items() if e.outcome == CONVERTED}
+    for stem in sorted(existing_files - recorded):
+        problems.append(f"{stem}.parquet: not recorded as converted in manifest")
+    return problems
 
 
 def main() -> None:
     args = parse_args()
+    if args.workers < 1:
+        raise ValueError(f"--workers must be at least 1, got {args.workers}")
     source_dir = args.source or GARMIN_FIT_FILES_PATH
     destination_dir = args.destination or PARQUET_RUN_ACTIVITIES_PATH
+    if args.rebuild_archive:
+        rebuild_archive(destination_dir, args.archive or ACTIVITY_ARCHIVE_PATH)
+        return
+    if args.rebuild_sketches:
+        sketches.rebuild_sketches(destination_dir)
+        print(f"Rebuilt distribution sketches in {sketches.sketches_path(destination_dir)}")
+        return
+    if args.rebuild_manifest or args.verify_manifest:
+        activity_files = fit_utils.list_fit_files(source_dir)
+        if args.rebuild_manifest:
+            rebuild_manifest(activity_files, destination_dir)
+            return
+        problems = verify_manifest(activity_files, destination_dir)
+        for problem in problems:
+            print(problem)
+        print(f"Manifest check found {len(problems)} problem(s).")
+        sys.exit(1 if problems else 0)
+
     ensure_directories(source_dir, destination_dir, args.mode)
 
     activity_files = fit_utils.list_fit_files(source_dir)
     print(f"{len(activity_files)} .fit files found in {source_dir}")
 
-    ingest_fit_files(activity_files, destination_dir, args.mode)
+    ingest_fit_files(
+        activity_files,
+        destination_dir,
+        args.mode,
+        args.workers,
+        archive_dir=args.archive,
+        compact=args.compact,
+        semicircles=args.semicircles,
+    )
 
 
 if __name__ == "__main__":
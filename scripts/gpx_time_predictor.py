@@ -3,12 +3,20 @@ Script to predict time to complete a GPX route based on historical activities.
 
 Usage:
     python -m scripts.gpx_time_predictor path/to/activities_dir path/to/route.gpx
+    python -m scripts.gpx_time_predictor path/to/activities_dir --serve [--socket path/to/predictor.sock]
+
+With --serve, models and pace baselines are loaded once and every request
+line (a GPX path, or JSON like {"gpx": "route.gpx"} or
+{"distance": 10000, "elevation_gain": 250} in meters) gets one JSON line of
+predictions back, read from stdin or from clients of a Unix socket.
 """
 
 from __future__ import annotations
 
 import argparse
 import json
+import signal
+import socketserver
 import sys
 from dataclasses import dataclass
 from pathlib import Path
@@ -18,11 +26,16 @@ import numpy as np
 import pandas as pd
 
 from utils.config import (
+    M_TO_FT_MULTIPLIER,
+    M_TO_MI_MULTIPLIER,
     MPS_TO_MPH_MULTIPLIER,
+    PACE_SPEEDS_PATH,
 )
 from models import pace as pace_models
-from models import time_linear, time_torch
+from models import time_linear, time_mlp
+from utils import activity as activity_utils
 from utils import gpx as gpxu
+from utils import pace_baselines
 from utils.time import hours_to_hhmmss
 
 
@@ -48,27 +61,46 @@ PACE_MODELS: tuple[PaceModel, ...] = (
     ),
 )
 
+# Every pace model reduces these two series
+PACE_MODEL_COLUMNS = ('distance', 'elapsed_seconds')
+
 DEFAULT_LINEAR_MODEL_PATH = Path("models/weights/time_linear_weights.json")
 ZONE_FEATURE_TARGETS_PATH = Path("models/weights/zone_feature_targets.json")
-DEFAULT_TORCH_MODEL_PATH = Path("models/weights/time_torch_weights.pt")
+# NumPy export of the TimeMLP checkpoint, so predicting never imports torch
+DEFAULT_MLP_MODEL_PATH = Path("models/weights/time_mlp_weights.npz")
 
 def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Predict time to complete a GPX route based on historical activities.",
     )
     parser.add_argument("datadir", type=Path, help="Directory containing activity parquet files")
-    parser.add_argument("gpxfile", type=Path, help="GPX file to predict time for")
-    return parser.parse_args(argv)
+    parser.add_argument("gpxfile", type=Path, nargs="?", help="GPX file to predict time for")
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Load everything once, then answer JSON-lines requests from stdin (or --socket)",
+    )
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=None,
+        help="With --serve, listen on this Unix socket path instead of stdin",
+    )
+    parser.add_argument(
+        "--pace-cache",
+        type=Path,
+        default=PACE_SPEEDS_PATH,
+        help=f"Parquet cache of per-activity pace-model speeds (default: {PACE_SPEEDS_PATH})",
+    )
+    args = parser.parse_args(argv)
+    if args.gpxfile is None and not args.serve:
+        parser.error("gpxfile is required unless --serve is given")
+    return args
 
 
 def iter_activity_dfs(activity_dir: Path) -> Iterable[tuple[Path, pd.DataFrame]]:
-    for parquet_path in sorted(activity_dir.glob("*.parquet")):
-        try:
-            df = pd.read_parquet(parquet_path)
-        except Exception as e:
-            sys.stderr.write(f"[warn] Skipping {parquet_path}: {e}\n")
-            continue
-        yield parquet_path, df
+    # Works for both a directory of per-activity parquet files and a partitioned archive
+    yield from activity_utils.iter_activities(activity_dir, columns=PACE_MODEL_COLUMNS)
 
 
 def model_speed_mph(df: pd.DataFrame, model: PaceModel) -> float:
@@ -80,20 +112,26 @@ def model_speed_mph(df: pd.DataFrame, model: PaceModel) -> float:
     return float(speed_mps * MPS_TO_MPH_MULTIPLIER)
 
 
-def evaluate_pace_models(activity_dir: Path) -> dict[str, float]:
-    activities = list(iter_activity_dfs(activity_dir))
-    if not activities:
+def evaluate_pace_models(activity_dir: Path, cache_path: Path = PACE_SPEEDS_PATH) -> dict[str, float]:
+    # Per-activity speeds are cached by file fingerprint, so only new or changed activities are read
+    speeds = pace_baselines.update_pace_speeds(
+        activity_dir,
+        cache_path,
+        {model.name: (lambda df, model=model: model_speed_mph(df, model)) for model in PACE_MODELS},
+        columns=PACE_MODEL_COLUMNS,
+    )
+    if speeds.empty:
         sys.stderr.write(f"No parquet activities found in {activity_dir}.\n")
         return {}
 
     results: dict[str, float] = {}
     for model in PACE_MODELS:
-        speeds = [model_speed_mph(df, model) for _, df in activities]
-        speeds = [s for s in speeds if pd.notna(s) and s > 0]
-        if not speeds:
+        usable = speeds[model.name].astype(float)
+        usable = usable[usable.notna() & (usable > 0)]
+        if usable.empty:
             sys.stderr.write(f"[warn] Model {model.name} had no usable activities.\n")
             continue
-        results[model.name] = float(np.mean(speeds))
+        results[model.name] = float(np.mean(usable))
     return results
 
 
@@ -111,20 +149,18 @@ def load_linear_model(weights_path: Path) -> time_linear.LinearTimeModel | None:
         return None
 
 
-def load_torch_model(
-    weights_path: Path,
-    device: str | None = None,
-) -> tuple[time_torch.TimeMLP, dict[str, np.ndarray]] | None:
+def load_mlp_model(weights_path: Path) -> time_mlp.NumpyTimeMLP | None:
     if not weights_path.exists():
-        sys.stderr.write(
-            f"[warn] Torch model weights not found at {weights_path}. Run the training notebook to generate them.\n"
-        )
+        hint = "Run the training notebook to generate them."
+        if weights_path.with_suffix(".pt").exists():
+            hint = f"Export the checkpoint with models.time_torch.export_checkpoint('{weights_path.with_suffix('.pt')}')."
+        sys.stderr.write(f"[warn] MLP model weights not found at {weights_path}. {hint}\n")
         return None
 
     try:
-        return time_torch.load_model(weights_path, device=device)
+        return time_mlp.load_model(weights_path)
     except Exception as exc:  # pragma: no cover - defensive load guard
-        sys.stderr.write(f"[warn] Failed to load torch model weights: {exc}\n")
+        sys.stderr.write(f"[warn] Failed to load MLP model weights: {exc}\n")
         return None
 
 
@@ -168,14 +204,12 @@ def linear_prediction(
 
 
 def torch_prediction(
-    bundle: tuple[time_torch.TimeMLP, dict[str, np.ndarray]],
+    model: time_mlp.NumpyTimeMLP,
     distance_mi: float,
     elev_gain_ft: float,
     overrides: dict[str, float] | None = None,
 ) -> tuple[dict[str, float], float]:
-    torch_model, stats = bundle
-    feature_names = stats["feature_names"].tolist()
-    base_values = dict(zip(feature_names, stats["mean"].tolist()))
+    base_values = dict(zip(model.feature_names, model.mean.tolist()))
 
     if "distance_mi" in base_values:
         base_values["distance_mi"] = distance_mi
@@ -187,7 +221,7 @@ def torch_prediction(
             if key in base_values and value is not None and not np.isnan(value):
                 base_values[key] = float(value)
 
-    eta_hours = time_torch.predict_hours(torch_model, stats, base_values)
+    eta_hours = model.predict_hours(base_values)
     return base_values, eta_hours
 
 
@@ -195,7 +229,7 @@ def print_predictions(
     distance_mi: float,
     model_speeds: dict[str, float],
     linear_model: time_linear.LinearTimeModel | None,
-    torch_model_bundle: tuple[time_torch.TimeMLP, dict[str, np.ndarray]] | None,
+    torch_model_bundle: time_mlp.NumpyTimeMLP | None,
     zone_overrides: dict[str, dict[str, float]],
     gpx_elev_gain_ft: float,
 ) -> None:
@@ -263,11 +297,147 @@ def print_predictions(
             )
 
 
+def _finite_hours(hours: float) -> float | None:
+    return float(hours) if hours > 0 and np.isfinite(hours) else None
+
+
+def collect_predictions(
+    distance_mi: float,
+    model_speeds: dict[str, float],
+    linear_model: time_linear.LinearTimeModel | None,
+    mlp_model: time_mlp.NumpyTimeMLP | None,
+    zone_overrides: dict[str, dict[str, float]],
+    gpx_elev_gain_ft: float,
+) -> dict[str, float | None]:
+    """Predicted hours per model and zone, keyed like the printed sections; None when invalid."""
+    predictions: dict[str, float | None] = {}
+    for name, speed_mph in model_speeds.items():
+        predictions[name] = _finite_hours(distance_mi / speed_mph) if speed_mph > 0 else None
+
+    if linear_model is not None:
+        predictions["linear_time_model"] = _finite_hours(
+            linear_prediction(linear_model, distance_mi, gpx_elev_gain_ft)[1]
+        )
+        for zone_name, overrides in zone_overrides.items():
+            predictions[f"linear_time_model:{zone_name}"] = _finite_hours(
+                linear_prediction(linear_model, distance_mi, gpx_elev_gain_ft, overrides)[1]
+            )
+
+    if mlp_model is not None:
+        predictions["torch_time_model"] = _finite_hours(
+            torch_prediction(mlp_model, distance_mi, gpx_elev_gain_ft)[1]
+        )
+        for zone_name, overrides in zone_overrides.items():
+            predictions[f"torch_time_model:{zone_name}"] = _finite_hours(
+                torch_prediction(mlp_model, distance_mi, gpx_elev_gain_ft, overrides)[1]
+            )
+    return predictions
+
+
+@dataclass(frozen=True)
+class RoutePredictor:
+    """Everything a prediction needs, loaded once for --serve."""
+
+    model_speeds: dict[str, float]
+    linear_model: time_linear.LinearTimeModel | None
+    mlp_model: time_mlp.NumpyTimeMLP | None
+    zone_overrides: dict[str, dict[str, float]]
+
+    @classmethod
+    def load(cls, datadir: Path, pace_cache: Path = PACE_SPEEDS_PATH) -> "RoutePredictor":
+        return cls(
+            model_speeds=evaluate_pace_models(datadir, pace_cache),
+            linear_model=load_linear_model(DEFAULT_LINEAR_MODEL_PATH),
+            mlp_model=load_mlp_model(DEFAULT_MLP_MODEL_PATH),
+            zone_overrides=load_zone_feature_targets(ZONE_FEATURE_TARGETS_PATH),
+        )
+
+    def handle(self, line: str) -> dict[str, object]:
+        """Answer one request line with a JSON-serializable response."""
+        request: dict[str, object] = {}
+        try:
+            text = line.strip()
+            request = json.loads(text) if text.startswith("{") else {"gpx": text}
+            if "gpx" in request:
+                distance, elev_gain = gpxu.route_summary(Path(str(request["gpx"])))
+            else:
+                distance = float(request["distance"])
+                elev_gain = float(request["elevation_gain"])
+        except Exception as exc:
+            return {"request": request or line.strip(), "error": str(exc)}
+
+        # Requests and route summaries are in meters; the models take miles and feet
+        predictions = collect_predictions(
+            distance * M_TO_MI_MULTIPLIER,
+            self.model_speeds,
+            self.linear_model,
+            self.mlp_model,
+            self.zone_overrides,
+            elev_gain * M_TO_FT_MULTIPLIER,
+        )
+        return {
+            "request": request,
+            "distance_m": distance,
+            "elevation_gain_m": elev_gain,
+            "predicted_hours": predictions,
+            "predicted_time": {
+                name: hours_to_hhmmss(hours) if hours is not None else None
+                for name, hours in predictions.items()
+            },
+        }
+
+
+def serve_lines(predictor: RoutePredictor, lines: Iterable[str], out) -> None:
+    for line in lines:
+        if not line.strip():
+            continue
+        out.write(json.dumps(predictor.handle(line)) + "\n")
+        out.flush()
+
+
+def serve_socket(predictor: RoutePredictor, path: Path) -> None:
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            lines = (raw.decode("utf-8") for raw in self.rfile)
+            serve_lines(predictor, lines, _SocketWriter(self.wfile))
+
+    path.unlink(missing_ok=True)
+    # Exit through the finally below on `kill`, so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with socketserver.ThreadingUnixStreamServer(str(path), Handler) as server:
+        sys.stderr.write(f"Serving predictions on {path}\n")
+        try:
+            server.serve_forever()
+        finally:
+            path.unlink(missing_ok=True)
+
+
+class _SocketWriter:
+    def __init__(self, wfile) -> None:
+        self.wfile = wfile
+
+    def write(self, text: str) -> None:
+        self.wfile.write(text.encode("utf-8"))
+
+    def flush(self) -> None:
+        self.wfile.flush()
+
+
 def main(argv: list[str] | None = None) -> int:
     args = parse_args(argv)
     if not args.datadir.exists() or not args.datadir.is_dir():
         sys.stderr.write(f"Directory {args.datadir} does not exist or is not a directory.\n")
         return 2
+    if args.serve:
+        predictor = RoutePredictor.load(args.datadir, args.pace_cache)
+        try:
+            if args.socket is not None:
+                serve_socket(predictor, args.socket)
+            else:
+                serve_lines(predictor, sys.stdin, sys.stdout)
+        except KeyboardInterrupt:
+            pass
+        return 0
     if not args.gpxfile.exists() or not args.gpxfile.is_file():
         sys.stderr.write(f"GPX file {args.gpxfile} does not exist or is not a file.\n")
         return 2
@@ -280,17 +450,17 @@ def main(argv: list[str] | None = None) -> int:
 
     print(f"Loaded GPX file: '{args.gpxfile}' ({distance:.2f}m, {elev_gain:.0f}m gain)")
 
-    model_speeds = evaluate_pace_models(args.datadir)
+    model_speeds = evaluate_pace_models(args.datadir, args.pace_cache)
     linear_model = load_linear_model(DEFAULT_LINEAR_MODEL_PATH)
-    torch_model_bundle = load_torch_model(DEFAULT_TORCH_MODEL_PATH)
+    torch_model_bundle = load_mlp_model(DEFAULT_MLP_MODEL_PATH)
     zone_overrides = load_zone_feature_targets(ZONE_FEATURE_TARGETS_PATH)
     print_predictions(
-        distance,
+        distance * M_TO_MI_MULTIPLIER,
         model_speeds,
         linear_model,
         torch_model_bundle,
         zone_overrides,
-        elev_gain,
+        elev_gain * M_TO_FT_MULTIPLIER,
     )
 
     return 0 if model_speeds or linear_model or torch_model_bundle else 1
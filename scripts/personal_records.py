@@ -0,0 +1,58 @@
+"""
+Print all-time and rolling personal-record curves: fastest times over
+standard distances and mean-maximal power and heart rate over standard
+durations. Best efforts are cached per activity, so only activities added
+or changed since the last run are read.
+
+Usage:
+    python -m scripts.personal_records [--datadir DIR] [--window 90D]
+"""
+
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+from utils import best_efforts as be
+from utils.config import BEST_EFFORTS_PATH, PARQUET_RUN_ACTIVITIES_PATH
+from utils.time import hours_to_hhmmss, seconds_to_hours
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Print personal-record curves from activity best efforts.")
+    parser.add_argument("--datadir", type=Path, default=PARQUET_RUN_ACTIVITIES_PATH, help="Activity parquet directory")
+    parser.add_argument("--cache", type=Path, default=BEST_EFFORTS_PATH, help="Per-activity best efforts cache")
+    parser.add_argument("--window", default="90D", help="Rolling window for the recent curve, e.g. 42D")
+    return parser.parse_args(argv)
+
+
+def _format_value(metric: str, value: float) -> str:
+    if pd.isna(value):
+        return "-"
+    if metric == "time":
+        return hours_to_hhmmss(seconds_to_hours(value))
+    return f"{value:.0f}"
+
+
+def records_table(all_time: pd.DataFrame, recent: pd.DataFrame) -> pd.DataFrame:
+    table = all_time[["metric", "target"]].copy()
+    for label, curve in (("all_time", all_time), ("recent", recent)):
+        table[label] = [_format_value(m, v) for m, v in zip(curve["metric"], curve["value"])]
+        table[f"{label}_date"] = pd.to_datetime(curve["activity_date"]).dt.date
+    return table
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    efforts = be.update_best_efforts(args.datadir, args.cache)
+    if efforts.empty:
+        print(f"No parquet activities found in {args.datadir}.")
+        return
+    all_time = be.best_effort_curve(efforts)
+    recent = be.rolling_best_effort_curve(efforts, args.window)
+    print(f"Personal records from {len(efforts)} activities (recent = last {args.window})")
+    print(records_table(all_time, recent).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+from pathlib import Path
+
+import pandas as pd
+
+from utils import archive
+from utils.activity import iter_activities
+
+SAMPLE_PARQUET = Path(__file__).resolve().parents[1] / "data" / "2025-06-30-15-07-06.parquet"
+
+
+def shifted(df: pd.DataFrame, offset: str) -> pd.DataFrame:
+    df = df.copy()
+    df['timestamp'] = pd.to_datetime(df['timestamp']) + pd.Timedelta(offset)
+    return df
+
+
+def archived_ids(archive_dir: Path) -> dict[str, int]:
+    return archive.read_archive(archive_dir, columns=['activity_id'])['activity_id'].value_counts().to_dict()
+
+
+def test_write_activities_streams_into_partitions(tmp_path):
+    df = pd.read_parquet(SAMPLE_PARQUET)
+    activities = [('june', df), ('august', shifted(df, '40D')), ('june-2', shifted(df, '1h'))]
+
+    assert archive.write_activities(tmp_path, iter(activities)) == 3
+
+    assert sorted(p.relative_to(tmp_path).as_posix() for p in tmp_path.rglob('*') if p.is_file()) == [
+        'year=2025/month=6/part-0.parquet',
+        'year=2025/month=8/part-0.parquet',
+    ]
+    assert archived_ids(tmp_path) == {'june': len(df), 'august': len(df), 'june-2': len(df)}
+    paths = [path for path, _ in iter_activities(tmp_path, columns=['distance'])]
+    assert sorted(path.name for path in paths) == ['august', 'june', 'june-2']
+
+
+def test_rewritten_activity_moves_partition(tmp_path):
+    df = pd.read_parquet(SAMPLE_PARQUET)
+    archive.write_activities(tmp_path, [('a', df), ('b', df)])
+
+    archive.write_activities(tmp_path, [('a', shifted(df, '40D'))])
+
+    assert archived_ids(tmp_path) == {'a': len(df), 'b': len(df)}
+    june = pd.read_parquet(tmp_path / 'year=2025' / 'month=6' / archive.PARTITION_FILE_NAME, columns=['activity_id'])
+    assert set(june['activity_id']) == {'b'}
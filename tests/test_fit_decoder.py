@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import pytest
+from fitparse.records import Crc
+from fitparse.utils import FitCRCError, FitEOFError
+
+from utils.fit_decoder import decode_fit, fit_crc
+
+SAMPLE_FIT_FILE = Path(__file__).resolve().parents[1] / "data" / "2025-06-30-15-07-06.fit"
+
+
+@pytest.fixture(scope="module")
+def fit_bytes() -> bytes:
+    return SAMPLE_FIT_FILE.read_bytes()
+
+
+def test_fit_crc_matches_fitparse(fit_bytes):
+    for chunk in (b"", b"\x00", b"FIT", fit_bytes[:12], fit_bytes[:-2]):
+        assert fit_crc(chunk) == Crc.calculate(chunk)
+
+
+def test_intact_file_decodes(fit_bytes):
+    assert len(decode_fit(fit_bytes).records.to_frame()) > 0
+
+
+def test_truncated_file_raises(fit_bytes):
+    with pytest.raises(FitEOFError):
+        decode_fit(fit_bytes[: len(fit_bytes) // 2])
+
+
+def test_truncated_crc_raises(fit_bytes):
+    with pytest.raises(FitEOFError):
+        decode_fit(fit_bytes[:-1])
+
+
+def test_corrupt_byte_raises(fit_bytes):
+    corrupt = bytearray(fit_bytes)
+    corrupt[len(corrupt) // 2] ^= 0xFF
+    with pytest.raises(FitCRCError):
+        decode_fit(bytes(corrupt))
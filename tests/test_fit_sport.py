@@ -0,0 +1,53 @@
+import io
+import struct
+from pathlib import Path
+
+from fitparse import FitFile
+
+from utils.fit import get_sport, sniff_sport
+from utils.fit_decoder import fit_crc
+
+SAMPLE_FIT_FILE = Path(__file__).resolve().parents[1] / "data" / "2025-06-30-15-07-06.fit"
+
+SPORT_MESG_NUM = 12
+SESSION_MESG_NUM = 18
+# (sport, sub_sport) field numbers per message
+SPORT_FIELDS = {SPORT_MESG_NUM: (0, 1), SESSION_MESG_NUM: (5, 6)}
+RUNNING, CYCLING = 1, 2
+GENERIC, TRAIL = 0, 3
+
+
+def build_fit(messages: list[tuple[int, int, int]]) -> bytes:
+    """A minimal FIT file of (mesg_num, sport, sub_sport) messages, each under a fresh definition."""
+    body = b""
+    for mesg_num, sport, sub_sport in messages:
+        sport_field, sub_sport_field = SPORT_FIELDS[mesg_num]
+        body += struct.pack("<BBBHB", 0x40, 0, 0, mesg_num, 2)
+        body += bytes([sport_field, 1, 0x00, sub_sport_field, 1, 0x00])
+        body += bytes([0x00, sport, sub_sport])
+    header = struct.pack("<BBHI4s", 14, 0x20, 2000, len(body), b".FIT")
+    header += struct.pack("<H", fit_crc(header))
+    return header + body + struct.pack("<H", fit_crc(header + body))
+
+
+def test_sniff_matches_get_sport_on_sample():
+    assert sniff_sport(SAMPLE_FIT_FILE) == get_sport(FitFile(str(SAMPLE_FIT_FILE)))
+
+
+def test_session_wins_over_earlier_sport_message():
+    data = build_fit([(SPORT_MESG_NUM, CYCLING, GENERIC), (SESSION_MESG_NUM, RUNNING, TRAIL)])
+    assert get_sport(FitFile(io.BytesIO(data))) == ("running", "trail")
+    assert sniff_sport(data) == ("running", "trail")
+
+
+def test_sport_message_used_without_session():
+    data = build_fit([(SPORT_MESG_NUM, CYCLING, GENERIC)])
+    assert sniff_sport(data) == get_sport(FitFile(io.BytesIO(data))) == ("cycling", "generic")
+
+
+def test_sniff_reads_from_path_and_handle(tmp_path):
+    data = build_fit([(SESSION_MESG_NUM, RUNNING, GENERIC)])
+    path = tmp_path / "activity.fit"
+    path.write_bytes(data)
+    with path.open("rb") as handle:
+        assert sniff_sport(path) == sniff_sport(handle) == ("running", "generic")
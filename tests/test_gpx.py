@@ -0,0 +1,52 @@
+import pytest
+
+from utils import gpx
+from utils.geodesic import segment_lengths
+
+# Two segments about 11 km apart, e.g. a watch restarted after a drive
+SEGMENTS = [
+    [(37.7700, -122.4500, 10.0), (37.7710, -122.4500, 12.0), (37.7720, -122.4500, 15.0)],
+    [(37.8700, -122.4500, 20.0), (37.8710, -122.4500, 18.0)],
+]
+
+
+def track_gpx(segments) -> bytes:
+    body = "".join(
+        "<trkseg>" + "".join(
+            f'<trkpt lat="{lat}" lon="{lon}"><ele>{ele}</ele></trkpt>' for lat, lon, ele in points
+        ) + "</trkseg>"
+        for points in segments
+    )
+    return (
+        '<?xml version="1.0"?><gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1">'
+        f"<trk>{body}</trk></gpx>"
+    ).encode()
+
+
+def within_segments_distance(segments) -> float:
+    return sum(
+        segment_lengths([p[0] for p in points], [p[1] for p in points]).sum() for points in segments
+    )
+
+
+@pytest.mark.parametrize("reader", [gpx._stream_points, gpx._gpxpy_points])
+def test_points_carry_segment_ids(reader):
+    points = reader(track_gpx(SEGMENTS))
+
+    assert points['segment'].tolist() == [0, 0, 0, 1, 1]
+
+
+def test_distance_ignores_gap_between_segments():
+    df = gpx.gpx_to_df(track_gpx(SEGMENTS))
+
+    assert df['distance_change'].iloc[3] == 0.0
+    assert df['cum_distance'].iloc[-1] == pytest.approx(within_segments_distance(SEGMENTS))
+    assert df['cum_distance'].iloc[-1] < 400
+
+
+def test_route_summary_matches_single_segment_sum():
+    distance, _ = gpx.route_summary(track_gpx(SEGMENTS))
+
+    one_segment, _ = gpx.route_summary(track_gpx([SEGMENTS[0] + SEGMENTS[1]]))
+    assert distance == pytest.approx(within_segments_distance(SEGMENTS))
+    assert one_segment > 10_000
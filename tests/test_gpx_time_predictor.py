@@ -0,0 +1,54 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from models.time_linear import LinearTimeModel
+from scripts.gpx_time_predictor import RoutePredictor, main
+from utils import gpx
+from utils.config import M_TO_FT_MULTIPLIER, M_TO_MI_MULTIPLIER
+
+ROUTE = Path(__file__).resolve().parents[1] / "data" / "gpx_routes" / "tower_oab.gpx"
+
+
+@pytest.fixture
+def predictor() -> RoutePredictor:
+    linear = LinearTimeModel(
+        intercept=0.1,
+        coefficients=np.array([0.15, 0.0002]),  # Hours per mile and per foot of gain
+        feature_names=("distance_mi", "elevation_gain_ft"),
+        feature_means=np.array([5.0, 300.0]),
+    )
+    return RoutePredictor(
+        model_speeds={"avg_speed_basic": 6.0},
+        linear_model=linear,
+        mlp_model=None,
+        zone_overrides={},
+    )
+
+
+def test_distance_request_matches_gpx_request(predictor):
+    distance_m, gain_m = gpx.route_summary(ROUTE)
+
+    from_gpx = predictor.handle(str(ROUTE))
+    from_json = predictor.handle(json.dumps({"distance": distance_m, "elevation_gain": gain_m}))
+
+    assert from_json["predicted_hours"] == pytest.approx(from_gpx["predicted_hours"])
+    miles, feet = distance_m * M_TO_MI_MULTIPLIER, gain_m * M_TO_FT_MULTIPLIER
+    assert from_gpx["predicted_hours"]["avg_speed_basic"] == pytest.approx(miles / 6.0)
+    assert from_gpx["predicted_hours"]["linear_time_model"] == pytest.approx(0.1 + 0.15 * miles + 0.0002 * feet)
+
+
+def test_cli_gpx_path_matches_serve(predictor, monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr("scripts.gpx_time_predictor.evaluate_pace_models", lambda *args: predictor.model_speeds)
+    monkeypatch.setattr("scripts.gpx_time_predictor.load_linear_model", lambda *args: predictor.linear_model)
+    monkeypatch.setattr("scripts.gpx_time_predictor.load_mlp_model", lambda *args: None)
+    monkeypatch.setattr("scripts.gpx_time_predictor.load_zone_feature_targets", lambda *args: {})
+
+    assert main([str(tmp_path), str(ROUTE)]) == 0
+
+    served = predictor.handle(str(ROUTE))["predicted_time"]
+    printed = capsys.readouterr().out
+    assert f"Predicted time : {served['avg_speed_basic']}" in printed
+    assert f"Predicted time : {served['linear_time_model']}" in printed
@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gpx_time_prediction_models.training import train_linear
+from gpx_time_prediction_models.training.features import build_training_matrix
+from gpx_time_prediction_models.training.sufficient_stats import LinearSufficientStats
+from utils.activity_cache import refresh_activity_cache
+
+
+def write_summary(activity_dir: Path, name: str, rng: np.random.Generator) -> None:
+    trail = rng.random() < 0.3
+    distance = rng.uniform(3_000, 25_000)
+    gain = rng.uniform(0, 800)
+    pd.DataFrame([{
+        'road_distance': 0.0 if trail else distance,
+        'road_cum_elevation_gain': 0.0 if trail else gain,
+        'trail_distance': distance if trail else 0.0,
+        'trail_cum_elevation_gain': gain if trail else 0.0,
+        'sub_sport': 'trail' if trail else 'generic',
+        'elapsed_seconds': distance * (0.4 if trail else 0.3) + 2 * gain + rng.normal(0, 60),
+    }]).to_parquet(activity_dir / f"{name}.parquet")
+
+
+def refresh(activity_dir: Path, store: Path):
+    return refresh_activity_cache(activity_dir, store, lambda path: pd.read_parquet(path).iloc[0].to_dict(), "test")
+
+
+@pytest.fixture
+def history(tmp_path):
+    activity_dir = tmp_path / "activities"
+    activity_dir.mkdir()
+    rng = np.random.default_rng(1)
+    for i in range(30):
+        write_summary(activity_dir, f"run-{i:02d}", rng)
+    return activity_dir, tmp_path / "store.parquet", rng
+
+
+def test_refreshes_match_batch_fit(history):
+    activity_dir, store, rng = history
+    stats = LinearSufficientStats.empty()
+    stats.apply(refresh(activity_dir, store))
+
+    for i in range(3):
+        write_summary(activity_dir, f"run-{i:02d}", rng)
+    for i in range(3, 5):
+        (activity_dir / f"run-{i:02d}.parquet").unlink()
+    for i in range(30, 34):
+        write_summary(activity_dir, f"run-{i:02d}", rng)
+    delta = refresh(activity_dir, store)
+
+    assert stats.apply(delta) == (7, 5)
+    assert stats.count == 32 and stats.matches(delta.table)
+    train_linear.check_refit(
+        train_linear.train_from_stats(stats, "incremental", delta.table),
+        build_training_matrix(delta.table),
+    )
+    assert "rows" not in stats.to_dict()
+
+
+def test_missed_refresh_is_detected(history):
+    activity_dir, store, rng = history
+    stats = LinearSufficientStats.empty()
+    stats.apply(refresh(activity_dir, store))
+
+    write_summary(activity_dir, "run-00", rng)
+    delta = refresh(activity_dir, store)
+
+    assert not stats.matches(delta.table)
+    assert LinearSufficientStats.from_summaries(delta.table).matches(delta.table)
+
+
+def test_bootstrap_reservoir_is_bounded_and_stable(history):
+    activity_dir, store, rng = history
+    summaries = refresh(activity_dir, store).table
+
+    reservoir = train_linear.bootstrap_reservoir(summaries, size=10)
+    shuffled = train_linear.bootstrap_reservoir(summaries.sample(frac=1, random_state=0), size=10)
+
+    assert len(reservoir) == 10
+    assert sorted(reservoir.index) == sorted(shuffled.index)
+    kept = summaries[summaries['activity_path'].isin(reservoir.index)]
+    assert sorted(train_linear.bootstrap_reservoir(kept, size=10).index) == sorted(reservoir.index)
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from models import time_torch
+
+
+def summaries(n: int = 120) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    distance = rng.uniform(2, 15, n)
+    gain = rng.uniform(0, 1500, n)
+    return pd.DataFrame({
+        "distance_mi": distance,
+        "elevation_gain_ft": gain,
+        "elapsed_time_hours": distance / 6 + gain / 3000 + rng.normal(0, 0.05, n),
+    })
+
+
+def test_refit_trains_on_every_row_for_the_early_stopped_epoch_count():
+    config = time_torch.TrainingConfig(
+        hidden_sizes=(8,), epochs=400, lr=5e-3, full_batch=True,
+        validation_fraction=0.2, patience=20, refit=True, seed=0,
+    )
+
+    _, stats, history, metrics = time_torch.train_time_mlp_fast(
+        summaries(), ["distance_mi", "elevation_gain_ft"], config
+    )
+
+    assert metrics.train_rows == 120 and metrics.validation_rows == 0
+    assert metrics.epochs_run == len(history) == metrics.best_epoch + 1
+    assert metrics.validation_history
+    np.testing.assert_allclose(stats["mean"], summaries()[["distance_mi", "elevation_gain_ft"]].mean(), rtol=1e-5)
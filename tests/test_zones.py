@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from utils import zones
+
+
+def write_activity(path, heart_rate: float) -> None:
+    pd.DataFrame({
+        'timestamp': pd.date_range('2025-06-01', periods=60, freq='s'),
+        'elapsed_seconds': np.arange(60, dtype=float),
+        'heart_rate': np.full(60, heart_rate),
+        'power': np.full(60, 250.0),
+    }).to_parquet(path)
+
+
+def test_load_zone_seconds_only_reads_the_saved_table(tmp_path):
+    activity_dir = tmp_path / "activities"
+    activity_dir.mkdir()
+    cache = tmp_path / "zone_seconds.parquet"
+    write_activity(activity_dir / "a.parquet", 120)
+
+    assert zones.load_zone_seconds(activity_dir, cache).empty
+    assert not cache.exists()
+
+    refreshed = zones.update_zone_seconds(activity_dir, cache)
+    write_activity(activity_dir / "b.parquet", 190)
+    loaded = zones.load_zone_seconds(activity_dir, cache)
+
+    assert loaded['activity_path'].tolist() == refreshed['activity_path'].tolist() == [str(activity_dir / "a.parquet")]
+    assert loaded['hr_hiking_s'].iloc[0] == refreshed['hr_hiking_s'].iloc[0] == 59
+
+
+def test_load_zone_seconds_skips_rows_for_other_thresholds(tmp_path):
+    activity_dir = tmp_path / "activities"
+    activity_dir.mkdir()
+    cache = tmp_path / "zone_seconds.parquet"
+    write_activity(activity_dir / "a.parquet", 120)
+    zones.update_zone_seconds(activity_dir, cache)
+
+    edges = {prefix: edge + 1 for prefix, edge in zones.default_edges().items()}
+
+    assert zones.load_zone_seconds(activity_dir, cache, edges).empty
+    assert len(zones.load_zone_seconds(activity_dir, cache)) == 1
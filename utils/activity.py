@@ -1,17 +1,36 @@
 from __future__ import annotations
 
+import json
 import sys
 from pathlib import Path
+from typing import Iterator, Mapping, Sequence
 
 import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 
+from utils import archive
+from utils.archive import DateLike
 from utils.config import (
     M_TO_KM_MULTIPLIER
 )
+from utils.features import coordinate_degrees
 from utils.time import seconds_to_hours, hours_to_hhmmss
 from utils.config import PARQUET_RUN_ACTIVITIES_PATH
 
+# Bump whenever summarize_activity changes so stale footers fall back to a full read
+SUMMARY_SCHEMA_VERSION = 1
+SUMMARY_METADATA_KEY = b'run_summary'
+
+# Every column summarize_activity may look at
+SUMMARY_COLUMNS = (
+    'timestamp', 'sport', 'sub_sport', 'elapsed_seconds',
+    'distance', 'distance_m', 'elevation', 'enhanced_altitude', 'elevation_m',
+    'heart_rate', 'cadence', 'power', 'position_lat', 'position_long',
+)
+
+RowFilters = list[tuple[str, str, object]]
+
 
 def get_recent_activities(
     activity_dir: Path=PARQUET_RUN_ACTIVITIES_PATH,
@@ -31,14 +50,134 @@ def get_recent_activities(
         return sorted_files[:limit]
 
 
+def load_activity(
+    path: Path,
+    columns: Sequence[str] | None = None,
+    dtypes: Mapping[str, object] | None = None,
+    filters: RowFilters | None = None,
+) -> pd.DataFrame:
+    """Read one activity parquet, deserializing only the requested columns.
+
+    Requested columns missing from the file are skipped rather than raising.
+    `filters` are pyarrow row filters (e.g. `[('is_moving', '==', 1)]`), which
+    may reference columns outside `columns`; `dtypes` casts the columns read.
+    """
+    if columns is not None:
+        available = set(pq.read_schema(path).names)
+        columns = [c for c in columns if c in available]
+    df = pd.read_parquet(path, columns=columns, filters=filters)
+    return _apply_dtypes(df, dtypes)
+
+
+def _apply_dtypes(df: pd.DataFrame, dtypes: Mapping[str, object] | None) -> pd.DataFrame:
+    if not dtypes:
+        return df
+    return df.astype({c: dtype for c, dtype in dtypes.items() if c in df.columns})
+
+
+def iter_activities(
+    source: Path,
+    columns: Sequence[str] | None = None,
+    start: DateLike | None = None,
+    end: DateLike | None = None,
+    sub_sport: str | Sequence[str] | None = None,
+    dtypes: Mapping[str, object] | None = None,
+    filters: RowFilters | None = None,
+) -> Iterator[tuple[Path, pd.DataFrame]]:
+    """Yield (activity path, samples) for every activity under `source`.
+
+    `source` is either a directory of per-activity parquet files or a
+    partitioned archive from `utils.archive`. An archive is read in one
+    vectorized scan with the date (activity start, `end` exclusive) and
+    sub_sport filters pushed down; per-activity files are read one by one
+    and filtered after loading. `columns`, `dtypes` and `filters` are as in
+    `load_activity`.
+
+    For an archive the yielded path is `source / activity_id`, a key that
+    does not exist on disk and cannot be passed to `load_activity`; its
+    `name` is the activity id, as the `stem` of a parquet file's path is.
+    """
+    source = Path(source)
+    if archive.is_archive(source):
+        df = archive.read_archive(
+            source, columns=columns, start=start, end=end, sub_sport=sub_sport, filters=filters
+        )
+        for activity_id, activity_df in df.groupby('activity_id', sort=False):
+            activity_df = activity_df.drop(columns='activity_id').reset_index(drop=True)
+            yield source / activity_id, _apply_dtypes(activity_df, dtypes)
+        return
+
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    sub_sports = {sub_sport} if isinstance(sub_sport, str) else set(sub_sport or ())
+    filter_columns = (['sub_sport'] if sub_sports else []) + (['timestamp'] if start is not None or end is not None else [])
+    read_columns = None if columns is None else [*columns, *(c for c in filter_columns if c not in columns)]
+    for path in sorted(source.glob('*.parquet')):
+        try:
+            df = load_activity(path, read_columns, filters=filters)
+        except Exception as exc:  # pragma: no cover - defensive I/O guard
+            sys.stderr.write(f"[warn] Skipping {path}: {exc}\n")
+            continue
+        if sub_sports and ('sub_sport' not in df.columns or df.empty or df['sub_sport'].iloc[0] not in sub_sports):
+            continue
+        if start is not None or end is not None:
+            activity_start = df['timestamp'].min() if 'timestamp' in df.columns else pd.NaT
+            if pd.isna(activity_start):
+                continue
+            if (start is not None and activity_start < start) or (end is not None and activity_start >= end):
+                continue
+        if columns is not None:
+            df = df[[c for c in columns if c in df.columns]]
+        yield path, _apply_dtypes(df, dtypes)
+
+
+def summary_metadata(summary: dict[str, object]) -> dict[bytes, bytes]:
+    """Encode a summary as parquet footer key-value metadata."""
+    payload = {'version': SUMMARY_SCHEMA_VERSION, 'summary': {}}
+    for key, value in summary.items():
+        if key == 'activity_path':
+            continue  # resolved from wherever the file is read
+        if isinstance(value, pd.Timestamp):
+            value = value.isoformat()
+        elif isinstance(value, (np.integer, np.floating)):
+            value = value.item()
+        elif value is not None and not isinstance(value, (int, float, str)):
+            value = str(value)
+        payload['summary'][key] = value
+    return {SUMMARY_METADATA_KEY: json.dumps(payload).encode('utf-8')}
+
+
+def read_footer_summary(activity_file: Path) -> dict[str, object] | None:
+    """Return the summary stored in a parquet footer, or None if absent or outdated."""
+    metadata = pq.read_schema(activity_file).metadata or {}
+    raw = metadata.get(SUMMARY_METADATA_KEY)
+    if raw is None:
+        return None
+    payload = json.loads(raw)
+    if payload.get('version') != SUMMARY_SCHEMA_VERSION:
+        return None
+    summary = {'activity_path': str(activity_file), **payload['summary']}
+    if summary.get('activity_date') is not None:
+        summary['activity_date'] = pd.Timestamp(summary['activity_date'])
+    return summary
+
+
 def activity_summary(activity_file: Path) -> dict[str, float]:
-    """Load a single activity parquet file and compute basic summary metrics."""
+    """Summarize a single activity parquet file, from its footer metadata when present."""
     try:
-        df = pd.read_parquet(activity_file)
+        summary = read_footer_summary(activity_file)
+        if summary is not None:
+            return summary
+        df = load_activity(activity_file, SUMMARY_COLUMNS)
     except Exception as exc:  # pragma: no cover - defensive I/O guard
         sys.stderr.write(f"[warn] Skipping {activity_file}: {exc}\n")
         return {}
 
+    return summarize_activity(activity_file, df)
+
+
+def summarize_activity(activity_file: Path, df: pd.DataFrame) -> dict[str, float]:
+    """Compute basic summary metrics for one activity's samples."""
     if df.empty:
         sys.stderr.write(f"[warn] Activity {activity_file} is empty\n")
         return {}
@@ -87,16 +226,24 @@ def activity_summary(activity_file: Path) -> dict[str, float]:
         'avg_hr': _mean_value(df, 'heart_rate'),
         'avg_cadence': _mean_value(df, 'cadence'),
         'avg_power': _mean_value(df, 'power'),
-        'start_lat': df['position_lat'].iloc[0] if 'position_lat' in df.columns else float('nan'),
-        'start_long': df['position_long'].iloc[0] if 'position_long' in df.columns else float('nan'),
+        'start_lat': _first_degrees(df, 'position_lat'),
+        'start_long': _first_degrees(df, 'position_long'),
     }
 
 
 def activities_summary(activity_dir: Path) -> pd.DataFrame:
-    """Create summaries for every parquet file in a directory."""
+    """Create summaries for every activity in a parquet directory or archive."""
+    activity_dir = Path(activity_dir)
+    if archive.is_archive(activity_dir):
+        summaries = (
+            summarize_activity(path, df)
+            for path, df in iter_activities(activity_dir, columns=SUMMARY_COLUMNS)
+        )
+    else:
+        summaries = (activity_summary(path) for path in sorted(activity_dir.glob('*.parquet')))
+
     records = []
-    for path in sorted(activity_dir.glob('*.parquet')):
-        summary = activity_summary(path)
+    for summary in summaries:
         if not summary:
             continue
         records.append(summary)
@@ -155,3 +302,10 @@ def _mean_value(df: pd.DataFrame, column: str) -> float:
         return float('nan')
     value = df[column].mean(skipna=True)
     return float(value) if not np.isnan(value) else float('nan')
+
+
+def _first_degrees(df: pd.DataFrame, column: str) -> float:
+    if column not in df.columns or df.empty:
+        return float('nan')
+    value = coordinate_degrees(df[column].iloc[:1]).iloc[0]
+    return float(value) if pd.notna(value) else float('nan')
@@ -0,0 +1,132 @@
+"""Per-activity derived tables kept in step with an activity directory.
+
+One row per activity parquet, keyed by path and fingerprinted by size, mtime
+and sha256 plus a caller-supplied version. A refresh only recomputes
+activities that are new, changed, or were computed under another version
+(e.g. different zone thresholds), and drops deleted ones. Rows cached for
+other directories are kept, so one cache file can serve several.
+"""
+
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+from utils.storage import atomic_write_parquet, file_fingerprint
+
+FINGERPRINT_COLUMNS = ['size', 'mtime_ns', 'sha256', 'cache_version']
+
+ADDED = "added"
+UPDATED = "updated"
+REMOVED = "removed"
+
+# Returns the derived columns for one activity, or an empty dict to leave it out
+RowFunc = Callable[[Path], dict]
+
+
+@dataclass(frozen=True)
+class CacheRefresh:
+    table: pd.DataFrame  # Current rows for the directory, without fingerprints
+    changes: pd.DataFrame  # Recomputed rows and removed paths, with a `change` column
+    # Rows as cached before this refresh for every updated or removed path, so
+    # consumers keeping running aggregates can subtract them
+    previous: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+    @property
+    def changed(self) -> bool:
+        return not self.changes.empty
+
+
+def load_activity_cache(path: Path) -> pd.DataFrame:
+    """Load a cache indexed by activity path. Missing file gives an empty table."""
+    path = Path(path)
+    if not path.exists():
+        return pd.DataFrame(columns=['activity_path', *FINGERPRINT_COLUMNS]).set_index('activity_path')
+    cache = pd.read_parquet(path).set_index('activity_path')
+    if 'cache_version' not in cache.columns:
+        # Written before versions were tracked: every row is stale
+        cache['cache_version'] = None
+    return cache
+
+
+def refresh_activity_cache(activity_dir: Path, cache_path: Path, compute: RowFunc, version: str) -> CacheRefresh:
+    """Bring the cache in line with `activity_dir`, recomputing only stale rows.
+
+    `version` should change whenever `compute` would give different results
+    for the same file.
+    """
+    activity_dir = Path(activity_dir)
+    cache = load_activity_cache(cache_path)
+    in_dir = pd.Series([Path(key).parent == activity_dir for key in cache.index], index=cache.index, dtype=bool)
+
+    rows = []
+    changes = []
+    previous_rows = []
+    dirty = False
+    for path in sorted(activity_dir.glob('*.parquet')):
+        key = str(path)
+        previous = cache.loc[key] if key in cache.index else None
+        current = previous is not None and previous['cache_version'] == version
+        fingerprint, unchanged = file_fingerprint(path, previous if current else None)
+        fingerprint['cache_version'] = version
+        if unchanged:
+            # Same contents under a new mtime: save it so the next run skips the hash
+            dirty = dirty or fingerprint['mtime_ns'] != previous['mtime_ns']
+            rows.append({'activity_path': key, **previous.to_dict(), **fingerprint})
+            continue
+        try:
+            row = compute(path)
+        except Exception as exc:  # pragma: no cover - defensive I/O guard
+            sys.stderr.write(f"[warn] Skipping {path}: {exc}\n")
+            continue
+        if not row:
+            continue
+        rows.append({**row, 'activity_path': key, **fingerprint})
+        changes.append({**row, 'activity_path': key, 'change': UPDATED if previous is not None else ADDED})
+        if previous is not None:
+            previous_rows.append({**previous.to_dict(), 'activity_path': key})
+        dirty = True
+
+    kept = {row['activity_path'] for row in rows}
+    removed = [key for key in cache.index[in_dir] if key not in kept]
+    changes.extend({'activity_path': key, 'change': REMOVED} for key in removed)
+    previous_rows.extend({**cache.loc[key].to_dict(), 'activity_path': key} for key in removed)
+
+    table = pd.DataFrame.from_records(rows) if rows else pd.DataFrame(columns=['activity_path', *FINGERPRINT_COLUMNS])
+    if dirty or len(table) != in_dir.sum() or not Path(cache_path).exists():
+        others = cache[~in_dir].reset_index()
+        combined = pd.concat([others, table], ignore_index=True) if len(others) else table
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_parquet(combined, cache_path)
+    return CacheRefresh(
+        table=table.drop(columns=FINGERPRINT_COLUMNS, errors='ignore'),
+        changes=pd.DataFrame.from_records(changes),
+        previous=pd.DataFrame.from_records(previous_rows).drop(columns=FINGERPRINT_COLUMNS, errors='ignore'),
+    )
+
+
+def read_activity_cache(activity_dir: Path, cache_path: Path, version: str) -> pd.DataFrame:
+    """Rows cached for `activity_dir` under `version`, without reading any activity.
+
+    Read-only counterpart of `update_activity_cache` for readers that leave
+    refreshing to another process; activities not yet refreshed are missing.
+    """
+    activity_dir = Path(activity_dir)
+    cache = load_activity_cache(cache_path)
+    keep = pd.Series(
+        [Path(key).parent == activity_dir for key in cache.index], index=cache.index, dtype=bool
+    ) & (cache['cache_version'] == version)
+    return cache[keep].reset_index().drop(columns=FINGERPRINT_COLUMNS)
+
+
+def update_activity_cache(activity_dir: Path, cache_path: Path, compute: RowFunc, version: str) -> pd.DataFrame:
+    """Return one `compute(path)` row per activity, recomputing only stale rows.
+
+    The returned table has `activity_path` and the computed columns, without
+    fingerprints.
+    """
+    return refresh_activity_cache(activity_dir, cache_path, compute, version).table
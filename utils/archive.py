@@ -0,0 +1,249 @@
+"""Partitioned activity archive.
+
+All run activities live in one hive-partitioned parquet dataset
+(`year=YYYY/month=M/part-0.parquet`) with a fixed typed schema, instead of
+one small parquet per activity. Each row carries its `activity_id` (the
+source file stem) and `activity_start`, so a whole-history scan is a single
+vectorized read and date/sub_sport filters are pushed down to partition
+pruning and row-group statistics.
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, Sequence, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from utils.features import coordinate_degrees
+from utils.storage import atomic_path
+
+DateLike = Union[str, date, datetime, pd.Timestamp]
+
+PARTITION_FILE_NAME = "part-0.parquet"
+ROW_GROUP_SIZE = 32_768  # ~6 activities per row group, keeps min/max stats selective
+COMPRESSION = "zstd"
+
+# Columns outside this schema (e.g. unidentified unknown_* vendor fields) are not archived.
+ARCHIVE_SCHEMA = pa.schema([
+    ("activity_id", pa.string()),
+    ("activity_start", pa.timestamp("us")),
+    ("timestamp", pa.timestamp("us")),
+    ("sport", pa.string()),
+    ("sub_sport", pa.string()),
+    ("activity_type", pa.string()),
+    ("elapsed_seconds", pa.float64()),
+    ("distance", pa.float64()),
+    ("enhanced_speed", pa.float64()),
+    ("enhanced_altitude", pa.float64()),
+    ("position_lat", pa.float64()),
+    ("position_long", pa.float64()),
+    ("heart_rate", pa.int16()),
+    ("wrist_heart_rate", pa.int16()),
+    ("cadence", pa.int16()),
+    ("fractional_cadence", pa.float64()),
+    ("complete_cadence", pa.float64()),
+    ("power", pa.int32()),
+    ("accumulated_power", pa.int64()),
+    ("temperature", pa.int16()),
+    ("stance_time", pa.float64()),
+    ("stance_time_balance", pa.float64()),
+    ("stance_time_percent", pa.float64()),
+    ("step_length", pa.float64()),
+    ("vertical_oscillation", pa.float64()),
+    ("vertical_ratio", pa.float64()),
+    ("cycle_length", pa.float64()),
+    ("is_moving", pa.int8()),
+    ("stamina_potential", pa.int16()),
+    ("stamina", pa.int16()),
+    ("body_battery", pa.int16()),
+    ("grade_adjusted_pace", pa.int32()),
+    ("performance_condition", pa.float64()),
+    ("elevation_change", pa.float64()),
+    ("elevation_gain", pa.float64()),
+    ("cum_elevation_gain", pa.float64()),
+    ("gradient", pa.float64()),
+    ("percent_grade", pa.float64()),
+    ("grade_degrees", pa.float64()),
+    ("origin_file_name", pa.string()),
+])
+PARTITIONING = ds.partitioning(
+    pa.schema([("year", pa.int16()), ("month", pa.int8())]), flavor="hive"
+)
+
+
+def is_archive(path: Path) -> bool:
+    """Return True if `path` is a partitioned activity archive rather than a directory of parquet files."""
+    path = Path(path)
+    return path.is_dir() and any(path.glob("year=*"))
+
+
+def _partition_dir(archive_dir: Path, year: int, month: int) -> Path:
+    return Path(archive_dir) / f"year={year}" / f"month={month}"
+
+
+def _partition_files(archive_dir: Path) -> list[Path]:
+    return sorted(Path(archive_dir).glob(f"year=*/month=*/{PARTITION_FILE_NAME}"))
+
+
+def activity_table(activity_id: str, df: pd.DataFrame) -> pa.Table:
+    """Conform a standardized activity frame to the archive schema."""
+    frame = df.reindex(columns=ARCHIVE_SCHEMA.names)
+    for column in ('position_lat', 'position_long'):
+        frame[column] = coordinate_degrees(frame[column])
+    frame['activity_id'] = activity_id
+    frame['activity_start'] = pd.to_datetime(df['timestamp']).min() if 'timestamp' in df.columns else pd.NaT
+    return pa.Table.from_pandas(frame, schema=ARCHIVE_SCHEMA, preserve_index=False)
+
+
+def _without(table: pa.Table, activity_ids: set[str]) -> pa.Table:
+    keep = pc.invert(pc.is_in(table['activity_id'], value_set=pa.array(sorted(activity_ids), pa.string())))
+    return table.filter(keep)
+
+
+def _write_partition(path: Path, table: pa.Table) -> None:
+    if table.num_rows == 0:
+        path.unlink(missing_ok=True)
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = table.sort_by([("activity_start", "ascending"), ("activity_id", "ascending"), ("timestamp", "ascending")])
+    with atomic_path(path) as tmp_path:
+        pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_SIZE, compression=COMPRESSION)
+
+
+def remove_activities(archive_dir: Path, activity_ids: Iterable[str], keep: Sequence[Path] = ()) -> None:
+    """Drop activities from every partition file, except the ones listed in `keep`."""
+    activity_ids = set(activity_ids)
+    if not activity_ids:
+        return
+    for path in _partition_files(archive_dir):
+        if path in keep:
+            continue
+        ids = pq.read_table(path, columns=['activity_id'])['activity_id']
+        if pc.any(pc.is_in(ids, value_set=pa.array(sorted(activity_ids), pa.string()))).as_py():
+            _write_partition(path, _without(pq.read_table(path, schema=ARCHIVE_SCHEMA), activity_ids))
+
+
+def _staging_path(partition_path: Path) -> Path:
+    # Dot-prefixed, so dataset discovery skips it like the atomic-write temp files
+    return partition_path.with_name(f".{partition_path.name}.{os.getpid()}.staging")
+
+
+def write_activities(archive_dir: Path, activities: Iterable[tuple[str, pd.DataFrame]]) -> int:
+    """Add or replace activities in the archive, rewriting each touched partition once.
+
+    Each activity is appended to a staging file for its partition as it
+    arrives, so only one activity is held in memory while reading the input.
+    The partitions are then rewritten one at a time with the staged rows.
+    Returns the number of activities written.
+    """
+    writers: dict[Path, pq.ParquetWriter] = {}
+    activity_ids: set[str] = set()
+    try:
+        for activity_id, df in activities:
+            table = activity_table(activity_id, df)
+            start = table['activity_start'][0].as_py() if table.num_rows else None
+            if start is None:
+                continue
+            path = _partition_dir(archive_dir, start.year, start.month) / PARTITION_FILE_NAME
+            if path not in writers:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                writers[path] = pq.ParquetWriter(_staging_path(path), ARCHIVE_SCHEMA, compression=COMPRESSION)
+            writers[path].write_table(table)
+            activity_ids.add(activity_id)
+        for writer in writers.values():
+            writer.close()
+
+        for path in sorted(writers):
+            tables = [pq.read_table(_staging_path(path), schema=ARCHIVE_SCHEMA)]
+            if path.exists():
+                tables.insert(0, _without(pq.read_table(path, schema=ARCHIVE_SCHEMA), activity_ids))
+            _write_partition(path, pa.concat_tables(tables))
+            _staging_path(path).unlink()
+    finally:
+        for path, writer in writers.items():
+            writer.close()
+            _staging_path(path).unlink(missing_ok=True)
+
+    # An activity whose start moved (re-synced file) must not stay in its old partition
+    remove_activities(archive_dir, activity_ids, keep=list(writers))
+    return len(activity_ids)
+
+
+def build_archive(activity_files: Iterable[Path], archive_dir: Path) -> int:
+    """Write per-activity parquet files into the archive, keyed by file stem."""
+    return write_activities(
+        archive_dir,
+        ((path.stem, pd.read_parquet(path)) for path in sorted(activity_files)),
+    )
+
+
+def _month_at_least(year: int, month: int) -> ds.Expression:
+    return (ds.field('year') > year) | ((ds.field('year') == year) & (ds.field('month') >= month))
+
+
+def _month_at_most(year: int, month: int) -> ds.Expression:
+    return (ds.field('year') < year) | ((ds.field('year') == year) & (ds.field('month') <= month))
+
+
+def archive_filter(
+    start: DateLike | None = None,
+    end: DateLike | None = None,
+    sub_sport: str | Sequence[str] | None = None,
+) -> ds.Expression | None:
+    """Build a pushdown filter on activity start (`start` inclusive, `end` exclusive) and sub_sport."""
+    expressions = []
+    if start is not None:
+        start = pd.Timestamp(start)
+        expressions.append(_month_at_least(start.year, start.month))
+        expressions.append(ds.field('activity_start') >= pa.scalar(start.to_pydatetime(), pa.timestamp('us')))
+    if end is not None:
+        end = pd.Timestamp(end)
+        expressions.append(_month_at_most(end.year, end.month))
+        expressions.append(ds.field('activity_start') < pa.scalar(end.to_pydatetime(), pa.timestamp('us')))
+    if sub_sport is not None:
+        values = [sub_sport] if isinstance(sub_sport, str) else list(sub_sport)
+        expressions.append(ds.field('sub_sport').isin(values))
+
+    if not expressions:
+        return None
+    expression = expressions[0]
+    for other in expressions[1:]:
+        expression = expression & other
+    return expression
+
+
+def read_archive(
+    archive_dir: Path,
+    columns: Sequence[str] | None = None,
+    start: DateLike | None = None,
+    end: DateLike | None = None,
+    sub_sport: str | Sequence[str] | None = None,
+    filters: list[tuple[str, str, object]] | None = None,
+) -> pd.DataFrame:
+    """Read archived samples in one scan, always including `activity_id`.
+
+    `filters` are extra pyarrow row filters, e.g. `[('is_moving', '==', 1)]`.
+    """
+    dataset = ds.dataset(Path(archive_dir), format="parquet", partitioning=PARTITIONING, schema=_dataset_schema())
+    if columns is not None:
+        columns = ['activity_id', *[c for c in columns if c != 'activity_id' and c in dataset.schema.names]]
+    expression = archive_filter(start, end, sub_sport)
+    if filters:
+        row_filter = pq.filters_to_expression(filters)
+        expression = row_filter if expression is None else expression & row_filter
+    table = dataset.to_table(columns=columns, filter=expression)
+    return table.to_pandas()
+
+
+def _dataset_schema() -> pa.Schema:
+    schema = ARCHIVE_SCHEMA
+    for field in PARTITIONING.schema:
+        schema = schema.append(field)
+    return schema
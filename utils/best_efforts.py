@@ -0,0 +1,170 @@
+"""Per-activity best efforts and the personal-record curves built from them.
+
+For every activity this finds the fastest elapsed time over standard
+distances and the mean-maximal power and heart rate over standard
+durations. Both are sliding windows over a cumulative, non-decreasing axis
+(distance for times, elapsed seconds for power and HR). So for each window
+end, the window start is located with one vectorized `searchsorted`
+instead of a rescan. An activity costs O(n log n) in NumPy, against the
+O(n²) of trying every pair of samples. An O(n) two-pointer sweep is 5-7x
+slower in Python, and its vectorized form (a stable merge) is no faster
+than `searchsorted` at any realistic length; `python -m scripts.benchmark
+best-efforts` compares all three. Window starts are interpolated between
+samples, so a 1 km effort is exactly 1000 m.
+
+Efforts are cached per activity fingerprint (`utils.activity_cache`), so a
+refresh after an ingest only reads new or changed activities. The all-time
+and rolling curves are reductions over that small table.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.activity import load_activity
+from utils.activity_cache import update_activity_cache
+from utils.config import MAX_SAMPLE_GAP_SECONDS
+
+# Bump when the distances, durations or method change so cached rows are recomputed
+BEST_EFFORTS_VERSION = 1
+
+BEST_EFFORT_DISTANCES: dict[str, float] = {  # Meters
+    '400m': 400.0,
+    '1km': 1000.0,
+    '1mi': 1609.344,
+    '5km': 5000.0,
+    '10km': 10000.0,
+    'half': 21097.5,
+}
+BEST_EFFORT_DURATIONS: dict[str, float] = {  # Seconds
+    '5s': 5, '15s': 15, '30s': 30, '1min': 60, '2min': 120, '5min': 300,
+    '10min': 600, '20min': 1200, '30min': 1800, '1h': 3600,
+}
+EFFORT_COLUMNS = ['timestamp', 'elapsed_seconds', 'distance', 'power', 'heart_rate']
+
+# Column prefix -> (metric, whether lower is better)
+METRICS = {'time': ('time', True), 'power': ('power', False), 'hr': ('heart_rate', False)}
+
+
+def _window_deltas(axis: np.ndarray, cumulative: np.ndarray, span: float) -> np.ndarray:
+    """cumulative[j] - cumulative(axis[j] - span) for every j whose window fits.
+
+    `axis` must be non-decreasing. The window start uses the last sample at
+    or before axis[j] - span, interpolated towards the next one.
+    """
+    targets = axis - span
+    valid = targets >= axis[0]
+    if not valid.any():
+        return np.empty(0)
+    ends = np.flatnonzero(valid)
+    targets = targets[ends]
+    starts = np.searchsorted(axis, targets, side='right') - 1
+    nxt = np.minimum(starts + 1, len(axis) - 1)
+    step = axis[nxt] - axis[starts]
+    frac = np.divide(targets - axis[starts], step, out=np.zeros_like(targets), where=step > 0)
+    start_values = cumulative[starts] + frac * (cumulative[nxt] - cumulative[starts])
+    return cumulative[ends] - start_values
+
+
+def fastest_times(distance, elapsed_seconds, distances: dict[str, float] = BEST_EFFORT_DISTANCES) -> dict[str, float]:
+    """Fastest elapsed seconds over each distance (NaN when the activity is shorter)."""
+    distance = np.asarray(distance, dtype=float)
+    elapsed_seconds = np.asarray(elapsed_seconds, dtype=float)
+    keep = np.isfinite(distance) & np.isfinite(elapsed_seconds)
+    distance, elapsed_seconds = distance[keep], elapsed_seconds[keep]
+    if len(distance) < 2:
+        return {name: float('nan') for name in distances}
+    # GPS jitter can step distance backwards; the cumulative maximum keeps the axis sorted
+    distance = np.maximum.accumulate(distance)
+    best = {}
+    for name, span in distances.items():
+        deltas = _window_deltas(distance, elapsed_seconds, span)
+        best[name] = float(deltas.min()) if len(deltas) else float('nan')
+    return best
+
+
+def mean_maximal(values, elapsed_seconds, durations: dict[str, float] = BEST_EFFORT_DURATIONS) -> dict[str, float]:
+    """Highest time-weighted mean of `values` over each duration (NaN when too short)."""
+    values = np.asarray(values, dtype=float)
+    elapsed_seconds = np.asarray(elapsed_seconds, dtype=float)
+    keep = np.isfinite(values) & np.isfinite(elapsed_seconds)
+    values, elapsed_seconds = values[keep], elapsed_seconds[keep]
+    if len(values) < 2:
+        return {name: float('nan') for name in durations}
+    # Each sample holds until the next one; the running integral makes any window one subtraction
+    dt = np.diff(elapsed_seconds)
+    held = np.where(dt <= MAX_SAMPLE_GAP_SECONDS, values[:-1] * dt, 0.0)
+    integral = np.concatenate(([0.0], np.cumsum(held)))
+    best = {}
+    for name, span in durations.items():
+        deltas = _window_deltas(elapsed_seconds, integral, span)
+        best[name] = float(deltas.max() / span) if len(deltas) else float('nan')
+    return best
+
+
+def activity_best_efforts(df: pd.DataFrame) -> dict[str, float]:
+    """Best efforts of one activity as flat `time_<distance>`, `power_<duration>`, `hr_<duration>` keys."""
+    efforts: dict[str, float] = {}
+    if {'distance', 'elapsed_seconds'} <= set(df.columns):
+        efforts.update({f'time_{k}': v for k, v in fastest_times(df['distance'], df['elapsed_seconds']).items()})
+    else:
+        efforts.update({f'time_{k}': float('nan') for k in BEST_EFFORT_DISTANCES})
+    for prefix, column in (('power', 'power'), ('hr', 'heart_rate')):
+        if column in df.columns and 'elapsed_seconds' in df.columns:
+            efforts.update({f'{prefix}_{k}': v for k, v in mean_maximal(df[column], df['elapsed_seconds']).items()})
+        else:
+            efforts.update({f'{prefix}_{k}': float('nan') for k in BEST_EFFORT_DURATIONS})
+    return efforts
+
+
+def _activity_row(path: Path) -> dict:
+    df = load_activity(path, EFFORT_COLUMNS)
+    activity_date = df['timestamp'].min() if 'timestamp' in df.columns else pd.NaT
+    return {'activity_date': activity_date, **activity_best_efforts(df)}
+
+
+def update_best_efforts(activity_dir: Path, cache_path: Path) -> pd.DataFrame:
+    """Compute efforts for new or changed activities, drop deleted ones, and return the table."""
+    return update_activity_cache(activity_dir, cache_path, _activity_row, f"best_efforts:{BEST_EFFORTS_VERSION}")
+
+
+def best_effort_curve(efforts: pd.DataFrame) -> pd.DataFrame:
+    """Best value per distance/duration across `efforts`, with the activity it came from.
+
+    One row per effort column: metric, target, value, activity_path,
+    activity_date. Lower is better for times, higher for power and HR.
+    """
+    records = []
+    for prefix, (metric, lower_is_better) in METRICS.items():
+        targets = BEST_EFFORT_DISTANCES if prefix == 'time' else BEST_EFFORT_DURATIONS
+        for target in targets:
+            column = f'{prefix}_{target}'
+            values = efforts[column].astype(float) if column in efforts else pd.Series(dtype=float)
+            if values.notna().any():
+                best = values.idxmin() if lower_is_better else values.idxmax()
+                row = efforts.loc[best]
+                records.append({
+                    'metric': metric, 'target': target, 'value': float(values[best]),
+                    'activity_path': row['activity_path'], 'activity_date': row['activity_date'],
+                })
+            else:
+                records.append({
+                    'metric': metric, 'target': target, 'value': float('nan'),
+                    'activity_path': None, 'activity_date': pd.NaT,
+                })
+    return pd.DataFrame.from_records(records)
+
+
+def rolling_best_effort_curve(
+    efforts: pd.DataFrame,
+    window: str | pd.Timedelta = '90D',
+    as_of: pd.Timestamp | None = None,
+) -> pd.DataFrame:
+    """`best_effort_curve` over activities in the `window` ending at `as_of` (default: latest activity)."""
+    dates = pd.to_datetime(efforts['activity_date'])
+    end = pd.Timestamp(as_of) if as_of is not None else dates.max()
+    recent = efforts[(dates > end - pd.Timedelta(window)) & (dates <= end)]
+    return best_effort_curve(recent.reset_index(drop=True))
@@ -60,7 +60,15 @@ ADDITIONAL_COLUMNS = [
 # Data paths
 DATA_PATH = Path("data")
 PARQUET_RUN_ACTIVITIES_PATH = DATA_PATH / "parquet_run_activities"
+ACTIVITY_ARCHIVE_PATH = DATA_PATH / "activity_archive"
 GARMIN_FIT_FILES_PATH = DATA_PATH / "garmin_fit_files"
+PACE_SPEEDS_PATH = DATA_PATH / "pace_speeds.parquet" # Per-activity pace-model speeds cache
+BEST_EFFORTS_PATH = DATA_PATH / "best_efforts.parquet" # Per-activity best efforts cache
+ZONE_SECONDS_PATH = DATA_PATH / "zone_seconds.parquet" # Per-activity time-in-zone cache
+
+
+# Activity samples further apart than this are a recording pause, not held time
+MAX_SAMPLE_GAP_SECONDS = 5.0
 
 
 # Lactate threshold values
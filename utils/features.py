@@ -30,3 +30,10 @@ def grade_degrees(gradient: pd.Series) -> pd.Series:
 def semicircle_to_degrees(s: pd.Series) -> pd.Series:
     """Convert a series of semicircles to degrees for lat/long."""
     return s * (180.0 / 2**31)
+
+
+def coordinate_degrees(s: pd.Series) -> pd.Series:
+    """Return lat/long in degrees, converting if stored as integer semicircles."""
+    if pd.api.types.is_integer_dtype(s.dtype):
+        return semicircle_to_degrees(s.astype('float64'))
+    return s
@@ -1,6 +1,8 @@
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Union
+from typing import Iterable, Union
 
+import numpy as np
 import pandas as pd
 from fitparse import FitFile
 
@@ -12,6 +14,7 @@ from utils.config import (
     MPS_TO_MPH_MULTIPLIER,
     MM_TO_FT_MULTIPLIER,
 )
+from utils.fit_decoder import FitSource, decode_fit, scan_messages
 from utils.features import (
     elapsed_seconds,
     gradient,
@@ -21,6 +24,50 @@ from utils.features import (
 )
 
 
+SPORT_MESSAGES = ('session', 'sport')
+
+# Opt-in compact storage for standardized frames. Integer columns keep NaN-free
+# data as NumPy ints and fall back to the nullable extension type otherwise.
+# float32 keeps ~7 significant digits: 1 cm at 100 km for distance, well under
+# the 0.1 m altitude and 1 ms speed resolution FIT records carry.
+COMPACT_DTYPES = {
+    'heart_rate': 'int16',
+    'wrist_heart_rate': 'int16',
+    'cadence': 'int16',
+    'temperature': 'int8',
+    'power': 'int16',
+    'accumulated_power': 'int32',
+    'is_moving': 'int8',
+    'stamina_potential': 'int8',
+    'stamina': 'int8',
+    'body_battery': 'int8',
+    'grade_adjusted_pace': 'int32',
+    'unknown_135': 'int16',
+    'distance': 'float32',
+    'enhanced_speed': 'float32',
+    'enhanced_altitude': 'float32',
+    'fractional_cadence': 'float32',
+    'complete_cadence': 'float32',
+    'stance_time': 'float32',
+    'step_length': 'float32',
+    'vertical_oscillation': 'float32',
+    'vertical_ratio': 'float32',
+    'cycle_length': 'float32',
+    'performance_condition': 'float32',
+    'elapsed_seconds': 'float32',
+    'elevation_change': 'float32',
+    'elevation_gain': 'float32',
+    'cum_elevation_gain': 'float32',
+    'gradient': 'float32',
+    'percent_grade': 'float32',
+    'grade_degrees': 'float32',
+    'sport': 'category',
+    'sub_sport': 'category',
+    'activity_type': 'category',
+    'origin_file_name': 'category',
+}
+
+
 def list_fit_files(directory: Union[str, Path]) -> list[Path]:
     """Return a list of .fit files in the given directory."""
     directory = Path(directory)
@@ -29,11 +76,37 @@ def list_fit_files(directory: Union[str, Path]) -> list[Path]:
 
 def get_sport(fit: FitFile) -> Union[str, str]:
     """Return the sport string from a FIT file, if present. Lowercased when returned."""
+    return sport_from_messages(
+        ({f.name: f.value for f in msg} for msg in fit.get_messages('session')),
+        ({f.name: f.value for f in msg} for msg in fit.get_messages('sport')),
+    )
+
+
+def sniff_sport(source: FitSource) -> tuple[str, str]:
+    """Return sport and sub_sport without decoding records.
+
+    The file is read incrementally and only session and sport messages are
+    decoded; records are skipped by size. Like `get_sport`, a session's values
+    win over sport messages, so the scan only stops at the first session
+    that carries both and otherwise reads to the end of the data.
+    """
+    messages = scan_messages(
+        source,
+        SPORT_MESSAGES,
+        stop=lambda name, m: name == 'session' and m.get('sport') is not None and m.get('sub_sport') is not None,
+    )
+    return sport_from_messages(messages['session'], messages['sport'])
+
+
+def sport_from_messages(
+    sessions: Iterable[dict],
+    sports: Iterable[dict],
+) -> Union[str, str]:
+    """Resolve sport and sub_sport from session messages, falling back to sport messages."""
     sport = ''
     sub_sport = ''
 
-    for msg in fit.get_messages('session'):
-        fields = {f.name: f.value for f in msg}
+    for fields in sessions:
         if fields.get('sport') is not None and sport == '':
             sport = str(fields['sport']).lower()
         if fields.get('sub_sport') is not None and sub_sport == '':
@@ -42,8 +115,7 @@ def get_sport(fit: FitFile) -> Union[str, str]:
             break
 
     if sport == '' or sub_sport == '':
-        for msg in fit.get_messages('sport'):
-            fields = {f.name: f.value for f in msg}
+        for fields in sports:
             if sport == '' and fields.get('sport') is not None:
                 sport = str(fields['sport']).lower()
             if sub_sport == '' and fields.get('sub_sport') is not None:
@@ -54,30 +126,72 @@ def get_sport(fit: FitFile) -> Union[str, str]:
     return sport, sub_sport
 
 
-def fit_to_df(fit: FitFile) -> pd.DataFrame:
-    """Read a .fit file and return a pandas DataFrame."""
-    rows = []
-    for record in fit.get_messages('record'):
-        data = {d.name: d.value for d in record}
-        rows.append(data)
+@dataclass(frozen=True)
+class FitActivity:
+    """Everything ingestion needs from one .fit file, decoded in a single pass."""
 
-    df = pd.DataFrame(rows)
+    sport: str
+    sub_sport: str
+    session: dict[str, object]  # First session message: totals such as total_distance
+    records: pd.DataFrame  # Renamed record columns plus sport/sub_sport
+
+
+def _records_frame(df: pd.DataFrame, sport: str, sub_sport: str) -> pd.DataFrame:
     if df.empty:
         df = pd.DataFrame(columns=EXPECTED_FIT_COLUMNS)
 
     df.rename(columns=UNKNOWN_COLUMN_MAP, inplace=True)
-    df['sport'], df['sub_sport'] = get_sport(fit)
+    df['sport'], df['sub_sport'] = sport, sub_sport
     return df
 
 
-def fit_to_parquet(fit: FitFile, parquet_path: str) -> None:
+def extract_fit_activity(source: FitSource) -> FitActivity:
+    """Decode a .fit file once and return its sport, session totals and records."""
+    decoded = decode_fit(source, message_names=SPORT_MESSAGES)
+    sessions = decoded.messages['session']
+    sport, sub_sport = sport_from_messages(sessions, decoded.messages['sport'])
+    return FitActivity(
+        sport=sport,
+        sub_sport=sub_sport,
+        session=sessions[0] if sessions else {},
+        records=_records_frame(decoded.records.to_frame(), sport, sub_sport),
+    )
+
+
+def fit_to_df(fit: Union[FitFile, FitSource]) -> pd.DataFrame:
+    """Read a .fit file and return a pandas DataFrame.
+
+    Paths, bytes and binary file objects go through `extract_fit_activity`;
+    an already opened `FitFile` is read through fitparse.
+    """
+    if not isinstance(fit, FitFile):
+        return extract_fit_activity(fit).records
+
+    rows = []
+    for record in fit.get_messages('record'):
+        data = {d.name: d.value for d in record}
+        rows.append(data)
+
+    return _records_frame(pd.DataFrame(rows), *get_sport(fit))
+
+
+def fit_to_parquet(fit: Union[FitFile, FitSource], parquet_path: str) -> None:
     """Convert a .fit file to a Parquet file."""
     df = fit_to_df(fit)
     df.to_parquet(parquet_path, index=False)
 
 
-def standardize_fit_df(df: pd.DataFrame) -> pd.DataFrame:
-    """Standardize and add additional features to a DataFrame created from a FIT file."""
+def standardize_fit_df(
+    df: pd.DataFrame,
+    compact: bool = False,
+    semicircles: bool = False,
+) -> pd.DataFrame:
+    """Standardize and add additional features to a DataFrame created from a FIT file.
+
+    With `compact`, columns are narrowed to `COMPACT_DTYPES` once all features
+    are derived. With `semicircles`, lat/long stay int32 semicircles; read them
+    through `features.coordinate_degrees`.
+    """
     if 'fractional_cadence' in df.columns:
         df['complete_cadence'] = df['cadence'] + df['fractional_cadence']
 
@@ -85,10 +199,14 @@ def standardize_fit_df(df: pd.DataFrame) -> pd.DataFrame:
 
     if df['sub_sport'].iloc[0] == 'treadmill':
         df.reset_index(drop=True, inplace=True)
-        return df
+        return compact_fit_df(df) if compact else df
 
-    df['position_lat'] = semicircle_to_degrees(df['position_lat'])
-    df['position_long'] = semicircle_to_degrees(df['position_long'])
+    if semicircles:
+        df['position_lat'] = df['position_lat'].astype('Int32')
+        df['position_long'] = df['position_long'].astype('Int32')
+    else:
+        df['position_lat'] = semicircle_to_degrees(df['position_lat'])
+        df['position_long'] = semicircle_to_degrees(df['position_long'])
 
     df['elevation_change'] = df['enhanced_altitude'].diff().fillna(0)
     df['elevation_gain'] = df['elevation_change'].clip(lower=0)
@@ -99,4 +217,24 @@ def standardize_fit_df(df: pd.DataFrame) -> pd.DataFrame:
     df['grade_degrees'] = grade_degrees(df['gradient'])
 
     df.reset_index(drop=True, inplace=True)
-    return df
+    return compact_fit_df(df) if compact else df
+
+
+def compact_fit_df(df: pd.DataFrame) -> pd.DataFrame:
+    """Narrow a standardized frame to `COMPACT_DTYPES`, skipping columns that do not fit."""
+    dtypes = {}
+    for column, dtype in COMPACT_DTYPES.items():
+        if column not in df.columns:
+            continue
+        series = df[column]
+        if dtype == 'category' or dtype.startswith('float'):
+            dtypes[column] = dtype
+            continue
+        values = pd.to_numeric(series, errors='coerce')
+        if values.notna().sum() != series.notna().sum():
+            continue  # non-numeric values, leave as is
+        info = np.iinfo(dtype)
+        if values.notna().any() and (values.min() < info.min or values.max() > info.max or (values % 1).any()):
+            continue
+        dtypes[column] = dtype if not values.isna().any() else dtype.capitalize()
+    return df.astype(dtypes)
@@ -0,0 +1,88 @@
+"""Vectorized distances between consecutive lat/long points.
+
+`segment_lengths` replaces a per-pair `geopy.distance.distance(...).m` loop
+with one NumPy pass over the whole coordinate array. The default `geodesic`
+method solves Vincenty's inverse problem on the WGS-84 ellipsoid for every
+pair at once and agrees with geopy (Karney) to well under a millimetre per
+segment; the rare pair that does not converge (nearly antipodal points) is
+handed to geographiclib. `haversine` is a faster spherical approximation,
+within about 0.5% of the ellipsoidal length.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from geographiclib.geodesic import Geodesic
+
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = (1 - WGS84_F) * WGS84_A
+MEAN_EARTH_RADIUS_M = 6371008.8
+
+VINCENTY_TOLERANCE = 1e-12
+VINCENTY_MAX_ITERATIONS = 200
+
+METHODS = ("geodesic", "haversine")
+
+
+def haversine_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in meters on a sphere of mean Earth radius."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=float)) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * MEAN_EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def vincenty_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Ellipsoidal (WGS-84) distance in meters, solving every pair at once."""
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (lat1, lon1, lat2, lon2)))
+    f = WGS84_F
+    L = np.radians(lon2 - lon1)
+    U1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - f) * np.tan(np.radians(lat2)))
+    sin_u1, cos_u1 = np.sin(U1), np.cos(U1)
+    sin_u2, cos_u2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    pending = np.isfinite(L) & np.isfinite(U1) & np.isfinite(U2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(VINCENTY_MAX_ITERATIONS):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+            cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cos_u1 * cos_u2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+            # Equatorial lines have cos2_alpha == 0
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha)
+            C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            lam_next = L + (1 - C) * f * sin_alpha * (
+                sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+            )
+            pending &= np.abs(lam_next - lam) > VINCENTY_TOLERANCE
+            lam = np.where(np.isfinite(lam_next), lam_next, lam)
+            if not pending.any():
+                break
+
+        u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+        ))
+        distance = WGS84_B * A * (sigma - delta_sigma)
+
+    distance = np.where(sin_sigma == 0, 0.0, distance)
+    for i in np.flatnonzero(pending):
+        distance.flat[i] = Geodesic.WGS84.Inverse(lat1.flat[i], lon1.flat[i], lat2.flat[i], lon2.flat[i])["s12"]
+    return distance
+
+
+def segment_lengths(lat, lon, method: str = "geodesic") -> np.ndarray:
+    """Return the n - 1 distances in meters between consecutive points."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown distance method {method!r}, expected one of {METHODS}")
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    kernel = vincenty_m if method == "geodesic" else haversine_m
+    return kernel(lat[:-1], lon[:-1], lat[1:], lon[1:])
@@ -1,29 +1,150 @@
+import io
+import threading
+import xml.etree.ElementTree as ET
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, replace
 from pathlib import Path
+from typing import BinaryIO, Union
 
 import gpxpy
-import geopy.distance
+import numpy as np
 import pandas as pd
 
+from utils.geodesic import segment_lengths
+from utils.storage import atomic_write_parquet, content_hash
 
-def gpx_to_df(gpx_path: Path) -> pd.DataFrame:
-    with open(gpx_path, 'r') as f:
-        gpx = gpxpy.parse(f)
-
-    gpx_pts = []
-    for point in gpx.tracks[0].segments[0].points:
-        try:
-            elevation = point.elevation
-        except AttributeError:
-            elevation = 0
-        gpx_pts.append((point.latitude, point.longitude, elevation))
-    df = pd.DataFrame(gpx_pts, columns=['position_lat', 'position_long', 'elevation'])
-
-    # Cumulative metrics
-    coords = [(p.position_lat, p.position_long) for p in df.itertuples()]
-    df['distance_change'] = [0] + [
-        geopy.distance.distance(x1, x2).m
-        for x1, x2 in zip(coords[:-1], coords[1:])
-    ]
+GpxSource = Union[str, Path, bytes, BinaryIO]
+
+# Bump when gpx_to_df output changes, so point frames cached on disk are recomputed
+POINTS_FORMAT_VERSION = 2
+
+
+class _PointBuffer:
+    """Growable typed arrays for one kind of GPX point (track or route)."""
+
+    def __init__(self) -> None:
+        self.lat = array('d')
+        self.lon = array('d')
+        self.ele = array('d')
+        self.segment = array('l')
+        self.time: list[str | None] = []
+        self._segment_id = 0
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def new_segment(self) -> None:
+        """Start a new track segment or route; points before it belong to earlier ones."""
+        if len(self):
+            self._segment_id = self.segment[-1] + 1
+
+    def append(self, lat: float, lon: float, ele: float | None, time: str | None) -> None:
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.ele.append(np.nan if ele is None else ele)
+        self.segment.append(self._segment_id)
+        self.time.append(time)
+
+    def to_frame(self) -> pd.DataFrame:
+        times = pd.to_datetime(pd.Series(self.time, dtype=object), utc=True, errors='coerce', format='ISO8601')
+        return pd.DataFrame({
+            'position_lat': np.frombuffer(self.lat, dtype=float),
+            'position_long': np.frombuffer(self.lon, dtype=float),
+            'elevation': np.frombuffer(self.ele, dtype=float),
+            'segment': np.asarray(self.segment, dtype=np.int64),
+            'time': times.dt.tz_localize(None).astype('datetime64[us]'),
+        })
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _stream_points(source: GpxSource) -> pd.DataFrame:
+    # One iterparse pass; each point is detached from its parent once read, so
+    # memory holds only the coordinate arrays, never the element tree.
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    tracks, routes = _PointBuffer(), _PointBuffer()
+    parents: list[ET.Element] = []
+    ele = time = None
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            parents.append(elem)
+            name = _local_name(elem.tag)
+            if name == 'trkseg':
+                tracks.new_segment()
+            elif name == 'rte':
+                routes.new_segment()
+            continue
+        parents.pop()
+        name = _local_name(elem.tag)
+        if name == 'ele' and elem.text:
+            ele = float(elem.text)
+        elif name == 'time':
+            time = elem.text
+        elif name in ('trkpt', 'rtept', 'wpt', 'metadata'):
+            if name in ('trkpt', 'rtept'):
+                buffer = tracks if name == 'trkpt' else routes
+                buffer.append(float(elem.get('lat')), float(elem.get('lon')), ele, time)
+            # Waypoint and metadata <ele>/<time> must not leak into the next point
+            ele = time = None
+            if parents:
+                parents[-1].remove(elem)
+    # Recorded tracks win over planned routes when a file carries both
+    return (tracks if len(tracks) else routes).to_frame()
+
+
+def _gpxpy_points(source: GpxSource) -> pd.DataFrame:
+    if isinstance(source, (str, Path)):
+        with open(source, 'r') as f:
+            gpx = gpxpy.parse(f)
+    else:
+        data = source if isinstance(source, bytes) else source.read()
+        gpx = gpxpy.parse(data.decode('utf-8') if isinstance(data, bytes) else data)
+
+    tracks, routes = _PointBuffer(), _PointBuffer()
+    for track in gpx.tracks:
+        for segment in track.segments:
+            tracks.new_segment()
+            for point in segment.points:
+                tracks.append(point.latitude, point.longitude, point.elevation,
+                              point.time.isoformat() if point.time else None)
+    for route in gpx.routes:
+        routes.new_segment()
+        for point in route.points:
+            routes.append(point.latitude, point.longitude, point.elevation,
+                          point.time.isoformat() if point.time else None)
+    return (tracks if len(tracks) else routes).to_frame()
+
+
+def read_gpx_points(source: GpxSource) -> pd.DataFrame:
+    """Read lat/long/elevation/time of every track point, or route point if there are no tracks.
+
+    All tracks and segments are concatenated in file order, with a
+    `segment` id that changes at every track segment (or route) boundary.
+    Files the streaming parser cannot handle are retried with gpxpy.
+    """
+    if hasattr(source, 'seek'):
+        start = source.tell()
+    try:
+        return _stream_points(source)
+    except (ET.ParseError, TypeError, ValueError):
+        if hasattr(source, 'seek'):
+            source.seek(start)
+        return _gpxpy_points(source)
+
+
+def gpx_to_df(gpx_path: GpxSource, distance_method: str = 'geodesic') -> pd.DataFrame:
+    df = read_gpx_points(gpx_path)
+
+    # Cumulative metrics; the gap between two segments is not part of the route
+    distance_change = np.concatenate((
+        [0.0], segment_lengths(df['position_lat'], df['position_long'], distance_method)
+    ))[:len(df)]
+    distance_change[1:][np.diff(df['segment'].to_numpy()) != 0] = 0.0
+    df['distance_change'] = distance_change
     df['cum_distance'] = df.distance_change.cumsum()
     if df.elevation.isnull().all():
         df['elevation'] = 0.0
@@ -33,13 +154,115 @@ def gpx_to_df(gpx_path: Path) -> pd.DataFrame:
     return df
 
 
-def route_summary(gpx_path: Path) -> tuple[float, float]:
-    df = gpx_to_df(gpx_path)
-    if df.empty:
-        raise RuntimeError(f"GPX contained no route points")
+@dataclass(frozen=True)
+class RouteAnalysis:
+    """Point frame and totals for one GPX file."""
+
+    sha256: str
+    points: pd.DataFrame  # gpx_to_df output
+    distance: float  # Meters
+    cum_elevation_gain: float  # Meters
+
+    @classmethod
+    def from_points(cls, sha256: str, points: pd.DataFrame) -> "RouteAnalysis":
+        if points.empty:
+            raise RuntimeError(f"GPX contained no route points")
+        return cls(
+            sha256=sha256,
+            points=points,
+            distance=float(points['cum_distance'].iloc[-1]),
+            cum_elevation_gain=float(points['cum_elevation_gain'].iloc[-1]),
+        )
+
+
+class RouteCache:
+    """LRU cache of route analyses keyed by the sha256 of the GPX bytes.
+
+    With `cache_dir`, point frames are also kept on disk as parquet so they
+    survive restarts. Callers get their own copy of the point frame.
+    """
+
+    def __init__(self, max_entries: int = 32, cache_dir: Path | None = None) -> None:
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, RouteAnalysis] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def get(self, source: GpxSource) -> RouteAnalysis:
+        data = _source_bytes(source)
+        key = content_hash(data)
+        with self._lock:
+            analysis = self._entries.get(key)
+            if analysis is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if analysis is None:
+            analysis = self._load(key)
+            if analysis is not None:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+                analysis = RouteAnalysis.from_points(key, gpx_to_df(data))
+                self._save(analysis)
+            self._put(analysis)
+        return replace(analysis, points=analysis.points.copy())
+
+    def _put(self, analysis: RouteAnalysis) -> None:
+        with self._lock:
+            self._entries[analysis.sha256] = analysis
+            self._entries.move_to_end(analysis.sha256)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Path | None:
+        return self.cache_dir / f"{key}.v{POINTS_FORMAT_VERSION}.parquet" if self.cache_dir is not None else None
+
+    def _load(self, key: str) -> RouteAnalysis | None:
+        path = self._disk_path(key)
+        if path is None or not path.exists():
+            return None
+        return RouteAnalysis.from_points(key, pd.read_parquet(path))
+
+    def _save(self, analysis: RouteAnalysis) -> None:
+        path = self._disk_path(analysis.sha256)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_parquet(analysis.points, path)
+
+
+ROUTE_CACHE = RouteCache()
+
+
+def _source_bytes(source: GpxSource) -> bytes:
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, (str, Path)):
+        return Path(source).read_bytes()
+    return source.read()
+
 
-    distance = float(df['cum_distance'].iloc[-1])
+def analyze_route(source: GpxSource, cache: RouteCache = ROUTE_CACHE) -> RouteAnalysis:
+    """Return the point frame and totals for a GPX file, parsing it at most once per content."""
+    return cache.get(source)
 
-    cum_elevation_gain = float(df['cum_elevation_gain'].iloc[-1])
 
-    return distance, cum_elevation_gain
+def route_summary(gpx_path: GpxSource) -> tuple[float, float]:
+    analysis = analyze_route(gpx_path)
+    return analysis.distance, analysis.cum_elevation_gain
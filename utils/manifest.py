@@ -0,0 +1,89 @@
+"""Persistent record of every .fit file seen by ingestion.
+
+One entry per source file with its size, mtime, content hash, detected sport
+and outcome, so incremental runs only touch new or changed files, including
+non-running files that never produce a parquet.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+
+from utils.storage import atomic_write_json, content_hash, file_stat
+
+MANIFEST_FILE_NAME = "ingestion_manifest.json"
+MANIFEST_VERSION = 1
+
+CONVERTED = "converted"
+SKIPPED = "skipped"
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+    sport: str
+    sub_sport: str
+    outcome: str  # CONVERTED or SKIPPED
+
+    @classmethod
+    def from_bytes(cls, path: Path, data: bytes, sport: str, sub_sport: str, outcome: str) -> "ManifestEntry":
+        size, mtime_ns = file_stat(path)
+        return cls(
+            path=str(path),
+            size=size,
+            mtime_ns=mtime_ns,
+            sha256=content_hash(data),
+            sport=sport,
+            sub_sport=sub_sport,
+            outcome=outcome,
+        )
+
+    def refresh(self, path: Path) -> "ManifestEntry | None":
+        """Return this entry if `path` still has the same contents, else None.
+
+        Size and mtime are checked first; the file is only hashed when they
+        differ, e.g. after a re-sync that rewrote an identical file.
+        """
+        size, mtime_ns = file_stat(path)
+        if (size, mtime_ns) == (self.size, self.mtime_ns):
+            return self
+        if size != self.size or content_hash(Path(path).read_bytes()) != self.sha256:
+            return None
+        return replace(self, path=str(path), mtime_ns=mtime_ns)
+
+
+def manifest_path(destination_dir: Path) -> Path:
+    return Path(destination_dir) / MANIFEST_FILE_NAME
+
+
+def load_manifest(path: Path) -> dict[str, ManifestEntry]:
+    """Load manifest entries keyed by source file name. Missing file gives an empty manifest."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with path.open("r", encoding="utf-8") as f:
+        payload = json.load(f)
+    if payload.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version {payload.get('version')} in {path}")
+    return {name: ManifestEntry(**entry) for name, entry in payload["files"].items()}
+
+
+def prune_missing_sources(entries: dict[str, ManifestEntry]) -> list[str]:
+    """Drop entries whose source .fit file no longer exists, returning their names."""
+    missing = sorted(name for name, entry in entries.items() if not Path(entry.path).exists())
+    for name in missing:
+        del entries[name]
+    return missing
+
+
+def save_manifest(entries: dict[str, ManifestEntry], path: Path) -> None:
+    payload = {
+        "version": MANIFEST_VERSION,
+        "files": {name: asdict(entries[name]) for name in sorted(entries)},
+    }
+    atomic_write_json(payload, path)
@@ -0,0 +1,54 @@
+"""Per-activity pace-model speeds, cached by activity fingerprint.
+
+Each activity parquet is reduced to one speed per pace model once, through
+`utils.activity_cache`. Later runs only read activities that are new or
+changed (or every activity when the set of models changes), one at a time,
+so memory stays flat as the history grows. Rows for deleted activities are
+dropped.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Mapping, Sequence
+
+import pandas as pd
+
+from utils import archive
+from utils.activity import iter_activities, load_activity
+from utils.activity_cache import load_activity_cache, update_activity_cache
+
+SpeedFunc = Callable[[pd.DataFrame], float]
+
+
+def load_pace_speeds(path: Path) -> pd.DataFrame:
+    """Load cached speeds indexed by activity path. Missing file gives an empty table."""
+    return load_activity_cache(path)
+
+
+def update_pace_speeds(
+    activity_dir: Path,
+    cache_path: Path,
+    speed_funcs: Mapping[str, SpeedFunc],
+    columns: Sequence[str],
+) -> pd.DataFrame:
+    """Return one row of speeds per activity in `activity_dir`, refreshing the cache.
+
+    `columns` are the only columns read from each activity. Rows cached for
+    other directories are kept. An archive has no per-activity files to
+    fingerprint, so it is streamed through `speed_funcs` uncached.
+    """
+    activity_dir = Path(activity_dir)
+    names = list(speed_funcs)
+    if archive.is_archive(activity_dir):
+        return pd.DataFrame.from_records([
+            {'activity_path': str(path), **{name: func(df) for name, func in speed_funcs.items()}}
+            for path, df in iter_activities(activity_dir, columns=columns)
+        ], columns=['activity_path', *names])
+
+    def compute(path: Path) -> dict:
+        df = load_activity(path, columns)
+        return {name: func(df) for name, func in speed_funcs.items()}
+
+    table = update_activity_cache(activity_dir, cache_path, compute, 'pace_speeds:' + ','.join(sorted(names)))
+    return table.reindex(columns=['activity_path', *names])
@@ -0,0 +1,253 @@
+"""Mergeable, archive-wide distributions of heart rate, power, pace and grade.
+
+Each metric keeps a fixed-bin histogram (with underflow and overflow bins)
+and a merging t-digest for quantiles. Samples are weighted by their time
+delta, as in `utils.zones`. Both structures merge by addition plus one
+compression, and their size is fixed by the bin width and the digest
+compression, so the saved file and the cost of reading it do not depend on
+how many activities are included.
+
+The sketches hold no record of which activities they contain. Ingestion
+decides that from its manifest: newly converted runs are folded in, which
+costs only those runs. A re-converted or dropped run cannot be subtracted,
+so ingestion rebuilds the sketches from every parquet, one activity at a
+time. Readers such as the app only load the saved file.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from utils.activity import load_activity
+from utils.storage import atomic_write_json
+from utils.zones import sample_seconds
+
+SKETCHES_FILE_NAME = "distribution_sketches.json"
+SKETCHES_FORMAT_VERSION = 1
+
+DIGEST_COMPRESSION = 200  # Roughly the number of centroids kept; higher is more accurate
+# Slower than this is standing still, which would swamp the pace distribution
+MIN_PACE_SPEED_MPS = 0.5
+
+
+@dataclass(frozen=True)
+class SketchSpec:
+    column: str
+    low: float
+    high: float
+    width: float
+    unit: str
+
+    @property
+    def edges(self) -> np.ndarray:
+        return np.linspace(self.low, self.high, round((self.high - self.low) / self.width) + 1)
+
+
+SKETCH_SPECS: dict[str, SketchSpec] = {
+    'heart_rate': SketchSpec('heart_rate', 40, 220, 1, 'bpm'),
+    'power': SketchSpec('power', 0, 800, 5, 'W'),
+    'pace': SketchSpec('enhanced_speed', 2, 30, 0.1, 'min/km'),
+    'percent_grade': SketchSpec('percent_grade', -50, 50, 0.5, '%'),
+}
+SKETCH_COLUMNS = ['elapsed_seconds', *sorted({spec.column for spec in SKETCH_SPECS.values()})]
+
+
+def _k_scale(q: np.ndarray) -> np.ndarray:
+    # t-digest k1 scale: small clusters near the tails, large ones near the median
+    return DIGEST_COMPRESSION / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0.0, 1.0) - 1)
+
+
+def compress_centroids(means: np.ndarray, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Merge sorted-by-mean centroids so each spans at most one unit of the k scale."""
+    if len(means) == 0:
+        return means, weights
+    order = np.argsort(means, kind='stable')
+    means, weights = means[order], weights[order]
+    q_left = (np.cumsum(weights) - weights) / weights.sum()
+    groups = np.floor(_k_scale(q_left) - _k_scale(np.zeros(1))).astype(np.int64)
+    starts = np.flatnonzero(np.diff(groups, prepend=-1))
+    merged_weights = np.add.reduceat(weights, starts)
+    merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+    return merged_means, merged_weights
+
+
+@dataclass
+class MetricSketch:
+    spec: SketchSpec
+    counts: np.ndarray  # Seconds per bin: [underflow, bins..., overflow]
+    means: np.ndarray  # Digest centroids
+    weights: np.ndarray
+    minimum: float = float('inf')
+    maximum: float = float('-inf')
+
+    @classmethod
+    def empty(cls, spec: SketchSpec) -> "MetricSketch":
+        return cls(spec, np.zeros(len(spec.edges) + 1), np.empty(0), np.empty(0))
+
+    @property
+    def total_seconds(self) -> float:
+        return float(self.counts.sum())
+
+    def add(self, values: np.ndarray, seconds: np.ndarray) -> None:
+        """Fold in samples weighted by the seconds each stands for."""
+        keep = np.isfinite(values) & (seconds > 0)
+        values, seconds = values[keep], seconds[keep]
+        if not len(values):
+            return
+        self.counts += np.bincount(np.digitize(values, self.spec.edges), weights=seconds, minlength=len(self.counts))
+        self.means, self.weights = compress_centroids(
+            np.concatenate((self.means, values)), np.concatenate((self.weights, seconds))
+        )
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+
+    def merge(self, other: "MetricSketch") -> None:
+        self.counts += other.counts
+        self.means, self.weights = compress_centroids(
+            np.concatenate((self.means, other.means)), np.concatenate((self.weights, other.weights))
+        )
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def quantiles(self, qs) -> np.ndarray:
+        """Approximate time-weighted quantiles, interpolated between centroid midpoints."""
+        qs = np.asarray(qs, dtype=float)
+        if not len(self.weights):
+            return np.full(qs.shape, np.nan)
+        total = self.weights.sum()
+        midpoints = np.cumsum(self.weights) - self.weights / 2
+        return np.interp(
+            qs * total,
+            np.concatenate(([0.0], midpoints, [total])),
+            np.concatenate(([self.minimum], self.means, [self.maximum])),
+        )
+
+    def histogram(self) -> pd.DataFrame:
+        """In-range bins as left edge, right edge and seconds."""
+        edges = self.spec.edges
+        return pd.DataFrame({'left': edges[:-1], 'right': edges[1:], 'seconds': self.counts[1:-1]})
+
+    def to_dict(self) -> dict:
+        return {
+            'counts': self.counts.tolist(),
+            'means': self.means.tolist(),
+            'weights': self.weights.tolist(),
+            'minimum': self.minimum if np.isfinite(self.minimum) else None,
+            'maximum': self.maximum if np.isfinite(self.maximum) else None,
+        }
+
+    @classmethod
+    def from_dict(cls, spec: SketchSpec, payload: dict) -> "MetricSketch":
+        counts = np.asarray(payload['counts'], dtype=float)
+        if len(counts) != len(spec.edges) + 1:
+            raise ValueError(f"Histogram for {spec.column} has {len(counts)} bins, expected {len(spec.edges) + 1}")
+        return cls(
+            spec,
+            counts,
+            np.asarray(payload['means'], dtype=float),
+            np.asarray(payload['weights'], dtype=float),
+            float('inf') if payload['minimum'] is None else payload['minimum'],
+            float('-inf') if payload['maximum'] is None else payload['maximum'],
+        )
+
+
+def _metric_values(name: str, df: pd.DataFrame) -> np.ndarray | None:
+    spec = SKETCH_SPECS[name]
+    if spec.column not in df.columns:
+        return None
+    values = df[spec.column].to_numpy(dtype=float)
+    if name == 'pace':
+        with np.errstate(divide='ignore'):
+            values = np.where(values > MIN_PACE_SPEED_MPS, 1000 / (60 * values), np.nan)
+    return values
+
+
+def empty_sketches() -> dict[str, MetricSketch]:
+    return {name: MetricSketch.empty(spec) for name, spec in SKETCH_SPECS.items()}
+
+
+def add_activity(sketches: dict[str, MetricSketch], df: pd.DataFrame) -> None:
+    """Fold one activity's samples into every metric sketch."""
+    if 'elapsed_seconds' not in df.columns or df.empty:
+        return
+    seconds = sample_seconds(df['elapsed_seconds'])
+    for name, sketch in sketches.items():
+        values = _metric_values(name, df)
+        if values is not None:
+            sketch.add(values, seconds)
+
+
+def sketches_path(activity_dir: Path) -> Path:
+    return Path(activity_dir) / SKETCHES_FILE_NAME
+
+
+def load_sketches(path: Path) -> dict[str, MetricSketch] | None:
+    """Saved sketches, or None when the file is missing or was written with another format or bin layout."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    payload = json.loads(path.read_text())
+    if payload.get('format_version') != SKETCHES_FORMAT_VERSION or set(payload['metrics']) != set(SKETCH_SPECS):
+        return None
+    try:
+        return {name: MetricSketch.from_dict(SKETCH_SPECS[name], data) for name, data in payload['metrics'].items()}
+    except ValueError:
+        # Bin layout changed since the file was written
+        return None
+
+
+def save_sketches(path: Path, sketches: dict[str, MetricSketch]) -> None:
+    atomic_write_json({
+        'format_version': SKETCHES_FORMAT_VERSION,
+        'metrics': {name: sketch.to_dict() for name, sketch in sketches.items()},
+    }, path)
+
+
+def _fold(sketches: dict[str, MetricSketch], activity_files: Iterable[Path]) -> None:
+    for activity_file in activity_files:
+        try:
+            add_activity(sketches, load_activity(activity_file, SKETCH_COLUMNS))
+        except Exception as exc:  # pragma: no cover - defensive I/O guard
+            sys.stderr.write(f"[warn] Skipping {activity_file}: {exc}\n")
+
+
+def add_activities(path: Path, activity_files: Iterable[Path]) -> dict[str, MetricSketch]:
+    """Fold activities that are not yet in the saved sketches into them.
+
+    The caller decides what is new (ingestion uses its manifest); folding an
+    activity twice counts it twice.
+    """
+    sketches = load_sketches(path)
+    if sketches is None:
+        raise FileNotFoundError(f"No current distribution sketches at {path}; rebuild them first")
+    _fold(sketches, activity_files)
+    save_sketches(path, sketches)
+    return sketches
+
+
+def rebuild_sketches(activity_dir: Path, path: Path | None = None) -> dict[str, MetricSketch]:
+    """Recompute the sketches from every parquet in `activity_dir`, reading one activity at a time."""
+    activity_dir = Path(activity_dir)
+    sketches = empty_sketches()
+    _fold(sketches, sorted(activity_dir.glob('*.parquet')))
+    save_sketches(Path(path) if path is not None else sketches_path(activity_dir), sketches)
+    return sketches
+
+
+def percentile_table(sketches: dict[str, MetricSketch], percentiles=(5, 10, 25, 50, 75, 90, 95)) -> pd.DataFrame:
+    """One row per metric with the requested percentiles and total hours."""
+    rows = []
+    for name, sketch in sketches.items():
+        values = sketch.quantiles(np.asarray(percentiles) / 100)
+        rows.append({
+            'metric': name, 'unit': sketch.spec.unit, 'hours': sketch.total_seconds / 3600,
+            **{f'p{p}': float(v) for p, v in zip(percentiles, values)},
+        })
+    return pd.DataFrame.from_records(rows)
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Mapping
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+def _temp_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+
+@contextmanager
+def atomic_path(path: Path) -> Iterator[Path]:
+    """Yield a temp path next to `path` and move it into place once the block succeeds."""
+    path = Path(path)
+    tmp_path = _temp_path(path)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def atomic_write_parquet(
+    df: pd.DataFrame,
+    path: Path,
+    metadata: dict[bytes, bytes] | None = None,
+    **kwargs,
+) -> None:
+    """Write a DataFrame to parquet via a temp file so readers never see a partial file.
+
+    `metadata` is merged into the footer's key-value metadata next to pandas' own.
+    """
+    with atomic_path(path) as tmp_path:
+        if metadata is None:
+            df.to_parquet(tmp_path, index=False, **kwargs)
+            return
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+        pq.write_table(table, tmp_path, **kwargs)
+
+
+def atomic_write_json(payload: object, path: Path) -> None:
+    """Write JSON via a temp file so readers never see a partial file."""
+    with atomic_path(path) as tmp_path:
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+
+
+def content_hash(data: bytes) -> str:
+    """Return the sha256 hex digest of file contents."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_stat(path: Path) -> tuple[int, int]:
+    """Return (size in bytes, mtime in ns) for a file."""
+    stat = Path(path).stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def file_fingerprint(path: Path, previous: Mapping[str, object] | None = None) -> tuple[dict[str, object], bool]:
+    """Return ({size, mtime_ns, sha256}, unchanged) for `path` against a previous fingerprint.
+
+    The file is only hashed when size or mtime differ from `previous`.
+    """
+    path = Path(path)
+    size, mtime_ns = file_stat(path)
+    if previous is not None and (size, mtime_ns) == (previous['size'], previous['mtime_ns']):
+        return {'size': size, 'mtime_ns': mtime_ns, 'sha256': previous['sha256']}, True
+    sha256 = content_hash(path.read_bytes())
+    unchanged = previous is not None and size == previous['size'] and sha256 == previous['sha256']
+    return {'size': size, 'mtime_ns': mtime_ns, 'sha256': sha256}, unchanged
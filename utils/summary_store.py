@@ -0,0 +1,45 @@
+"""Persistent, incrementally updated table of run summaries.
+
+One row per activity parquet, kept by `utils.activity_cache`, so a refresh
+only summarizes new or changed activities and drops deleted ones instead of
+recomputing the whole history. Bumping `SUMMARY_SCHEMA_VERSION` resummarizes
+every activity.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+from utils.activity import SUMMARY_SCHEMA_VERSION, activity_summary
+from utils.activity_cache import (  # ADDED/UPDATED/REMOVED re-exported for callers
+    ADDED,
+    REMOVED,
+    UPDATED,
+    CacheRefresh,
+    load_activity_cache,
+    refresh_activity_cache,
+)
+
+SUMMARY_STORE_FILE_NAME = "run_summaries.parquet"
+
+
+class SummaryDelta(CacheRefresh):
+    """Current summaries (`summaries`, one row per activity), the rows that changed (`changes`)
+    and what updated or removed rows held before (`previous`)."""
+
+    @property
+    def summaries(self) -> pd.DataFrame:
+        return self.table
+
+
+def load_summary_store(path: Path) -> pd.DataFrame:
+    """Load the store indexed by activity path. Missing file gives an empty store."""
+    return load_activity_cache(path)
+
+
+def update_summary_store(activity_dir: Path, store_path: Path) -> SummaryDelta:
+    """Summarize new or changed activity parquet files and drop deleted ones."""
+    refresh = refresh_activity_cache(activity_dir, store_path, activity_summary, f"summary:{SUMMARY_SCHEMA_VERSION}")
+    return SummaryDelta(table=refresh.table, changes=refresh.changes, previous=refresh.previous)
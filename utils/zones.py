@@ -0,0 +1,118 @@
+"""Lactate-threshold effort zones and time-in-zone per activity.
+
+Zone edges are fractions of `LT_HR` and `LT_POWER` from `utils.config`.
+Every sample is classified with one `np.digitize` call. It is weighted by
+the seconds until the next sample rather than counted as a row, so gaps and
+irregular recording rates do not skew the totals. Per-activity zone seconds
+are cached by activity fingerprint and by the thresholds used. Changing
+the LT values in the config recomputes every row, and otherwise only new or
+changed activities are read. `scripts.export_run_summaries` refreshes the
+cache; readers such as the blog page only load it.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.activity import load_activity
+from utils.activity_cache import read_activity_cache, update_activity_cache
+from utils.config import LT_HR, LT_POWER, MAX_SAMPLE_GAP_SECONDS
+
+ZONE_NAMES: tuple[str, ...] = ('Hiking', 'Easy', 'Moderate', 'Hard')
+# Upper edge of each zone below Hard, as a fraction of the lactate threshold
+HR_ZONE_FRACTIONS: tuple[float, ...] = (0.75, 0.85, 1.0)
+POWER_ZONE_FRACTIONS: tuple[float, ...] = (0.50, 0.75, 1.0)
+
+ZONE_COLUMNS = ['timestamp', 'elapsed_seconds', 'heart_rate', 'power']
+# Signal prefix -> activity column
+SIGNALS = {'hr': 'heart_rate', 'power': 'power'}
+
+
+def zone_edges(threshold: float, fractions: tuple[float, ...]) -> np.ndarray:
+    """Lower edges of every zone after the first, rounded as the blog table shows them."""
+    return np.array([round(threshold * fraction, 1) for fraction in fractions])
+
+
+def default_edges() -> dict[str, np.ndarray]:
+    return {
+        'hr': zone_edges(LT_HR, HR_ZONE_FRACTIONS),
+        'power': zone_edges(LT_POWER, POWER_ZONE_FRACTIONS),
+    }
+
+
+def classify(values, edges: np.ndarray) -> np.ndarray:
+    """Zone index of every value (0 = Hiking ... 3 = Hard); a value on an edge goes to the higher zone."""
+    return np.digitize(np.asarray(values, dtype=float), edges)
+
+
+def sample_seconds(elapsed_seconds) -> np.ndarray:
+    """Seconds each sample stands for: the time to the next sample, zero across pauses and for the last one."""
+    elapsed_seconds = np.asarray(elapsed_seconds, dtype=float)
+    dt = np.diff(elapsed_seconds, append=elapsed_seconds[-1:] if len(elapsed_seconds) else [])
+    return np.where((dt >= 0) & (dt <= MAX_SAMPLE_GAP_SECONDS), dt, 0.0)
+
+
+def zone_seconds(values, elapsed_seconds, edges: np.ndarray) -> np.ndarray:
+    """Time-weighted seconds in each zone; samples with a missing value count for no zone."""
+    values = np.asarray(values, dtype=float)
+    weights = sample_seconds(elapsed_seconds)
+    known = np.isfinite(values) & np.isfinite(weights)
+    return np.bincount(classify(values[known], edges), weights=weights[known], minlength=len(ZONE_NAMES))
+
+
+def activity_zone_seconds(df: pd.DataFrame, edges: dict[str, np.ndarray] | None = None) -> dict[str, float]:
+    """Zone seconds and time-weighted mean of each signal as flat `<signal>_<zone>_s` and `<signal>_mean` keys."""
+    edges = edges or default_edges()
+    row: dict[str, float] = {}
+    for prefix, column in SIGNALS.items():
+        if column in df.columns and 'elapsed_seconds' in df.columns and len(df):
+            values = df[column].to_numpy(dtype=float)
+            seconds = zone_seconds(values, df['elapsed_seconds'], edges[prefix])
+            weights = sample_seconds(df['elapsed_seconds'])
+            known = np.isfinite(values)
+            total = weights[known].sum()
+            mean = float(np.dot(values[known], weights[known]) / total) if total > 0 else float('nan')
+        else:
+            seconds, mean = np.zeros(len(ZONE_NAMES)), float('nan')
+        row.update({f'{prefix}_{zone.lower()}_s': float(s) for zone, s in zip(ZONE_NAMES, seconds)})
+        row[f'{prefix}_mean'] = mean
+    return row
+
+
+def _cache_version(edges: dict[str, np.ndarray]) -> str:
+    return 'zones:' + json.dumps({prefix: edge.tolist() for prefix, edge in sorted(edges.items())})
+
+
+def update_zone_seconds(activity_dir: Path, cache_path: Path, edges: dict[str, np.ndarray] | None = None) -> pd.DataFrame:
+    """Zone seconds for every activity, recomputing new or changed activities or all of them when edges change."""
+    edges = edges or default_edges()
+
+    def compute(path: Path) -> dict:
+        df = load_activity(path, ZONE_COLUMNS)
+        activity_date = df['timestamp'].min() if 'timestamp' in df.columns else pd.NaT
+        return {'activity_date': activity_date, **activity_zone_seconds(df, edges)}
+
+    return update_activity_cache(activity_dir, cache_path, compute, _cache_version(edges))
+
+
+def load_zone_seconds(activity_dir: Path, cache_path: Path, edges: dict[str, np.ndarray] | None = None) -> pd.DataFrame:
+    """Zone seconds saved by the last `update_zone_seconds` with these edges, without reading any activity."""
+    return read_activity_cache(activity_dir, cache_path, _cache_version(edges or default_edges()))
+
+
+def zone_summary(table: pd.DataFrame, edges: dict[str, np.ndarray] | None = None) -> pd.DataFrame:
+    """Across all activities: share of HR and power time per zone, HR hours, and activities whose mean HR is in the zone."""
+    edges = edges or default_edges()
+    summary = pd.DataFrame({'zone': list(ZONE_NAMES)})
+    for prefix in SIGNALS:
+        seconds = np.array([table[f'{prefix}_{zone.lower()}_s'].sum() for zone in ZONE_NAMES]) if len(table) else np.zeros(len(ZONE_NAMES))
+        total = seconds.sum()
+        summary[f'{prefix}_percent'] = seconds / total * 100 if total > 0 else np.nan
+        summary[f'{prefix}_hours'] = seconds / 3600
+    means = table['hr_mean'].dropna().to_numpy(dtype=float) if len(table) else np.empty(0)
+    summary['activities_by_mean_hr'] = np.bincount(classify(means, edges['hr']), minlength=len(ZONE_NAMES))
+    return summary